@@ -0,0 +1,53 @@
+"""Gunicorn settings for start_django.py --production, read from the environment.
+
+DJANGO_SERVER_INTERFACE picks how Django is served:
+
+* ``wsgi`` (default): gthread workers, each with GUNICORN_THREADS threads.
+  Every thread keeps its database connection open (CONN_MAX_AGE).
+* ``asgi``: uvicorn workers, so the async views under /api/async/ serve
+  many slow reads per worker. Sync views run on a thread pool of
+  GUNICORN_THREADS per worker. Persistent connections are off; set
+  DB_POOL_MAX_SIZE to pool them instead.
+
+With more than one worker, set REDIS_URL to keep the catalog response cache.
+"""
+import multiprocessing
+import os
+
+interface = os.environ.setdefault('DJANGO_SERVER_INTERFACE', 'wsgi')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+if interface == 'asgi':
+    wsgi_app = 'nursery_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    # asgiref's thread pool for sync views and sync ORM calls
+    os.environ.setdefault('ASGI_THREADS', str(threads))
+else:
+    wsgi_app = 'nursery_backend.wsgi:application'
+    worker_class = 'gthread'
+
+# The catalog response cache (plants.cache) keeps its table versions in the
+# Django cache, which is per process unless REDIS_URL points at a shared one.
+# A write handled by one worker would then leave the others serving stale
+# responses, so without Redis the response cache is off.
+if workers > 1 and not os.environ.get('REDIS_URL'):
+    if int(os.environ.setdefault('PLANTS_CACHE_TIMEOUT', '0')):
+        raise RuntimeError("PLANTS_CACHE_TIMEOUT needs REDIS_URL when running more than one worker")
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Recycle workers now and then so slow leaks can't accumulate; the jitter
+# keeps them from all restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+def post_worker_init(worker):
+    # Import jobs run on worker thread pools and die with their worker, which
+    # max_requests makes routine; settle the ones a previous worker left
+    from plants.jobs import recover_import_jobs
+    recover_import_jobs()
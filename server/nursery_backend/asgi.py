@@ -1,3 +1,7 @@
+# Serve with an ASGI server, e.g.
+#   uvicorn nursery_backend.asgi:application --workers 4
+# so that the async catalog views under /api/async/ don't hold a thread
+# while they wait on the database.
 import os
 from django.core.asgi import get_asgi_application
 
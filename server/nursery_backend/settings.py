@@ -8,9 +8,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'your-secret-key-here')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# start_django.py --production turns it off unless DJANGO_DEBUG says otherwise.
+DEBUG = os.environ.get('DJANGO_DEBUG', 'true').lower() == 'true'
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '*').split(',')
 
 # Application definition
 INSTALLED_APPS = [
@@ -20,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'django_cleanup.apps.CleanupConfig',
@@ -27,6 +29,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so it times everything below; inactive unless PLANTS_INSTRUMENTATION
+    'plants.instrumentation.InstrumentationMiddleware',
+    # Above everything else that reads or changes the response body
+    'plants.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -66,9 +72,45 @@ DATABASES = {
         'PASSWORD': os.environ.get('PGPASSWORD'),
         'HOST': os.environ.get('PGHOST'),
         'PORT': os.environ.get('PGPORT'),
+        # Keep connections open between requests instead of reconnecting on
+        # every one; a connection that errored or sat idle is checked before
+        # it is reused. Under ASGI each request runs on a fresh thread, so
+        # persistent connections would only pile up; use DB_POOL_MAX_SIZE.
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DB_CONN_MAX_AGE', 0 if os.environ.get('DJANGO_SERVER_INTERFACE') == 'asgi' else 60
+        )),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection pooling (psycopg 3 only); replaces persistent connections
+if os.environ.get('DB_POOL_MAX_SIZE'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    }
+
+# Cache
+# Local memory by default; set REDIS_URL to share the cache (and the catalog
+# response cache versions in plants.cache) between worker processes.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,6 +147,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, configure properly in production
 
+# Brotli quality for CompressionMiddleware (0-11); higher is smaller but slower
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 5))
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -112,4 +157,63 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
-}
\ No newline at end of file
+    # Byte-for-byte JSONRenderer output, through orjson when it's installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'plants.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Background CSV imports
+PLANTS_IMPORT_WORKERS = int(os.environ.get('PLANTS_IMPORT_WORKERS', 2))
+# Where queued uploads wait for their job; outside MEDIA_ROOT so they are
+# never served, and deleted once the job finishes
+PLANTS_IMPORT_UPLOAD_ROOT = os.environ.get('PLANTS_IMPORT_UPLOAD_ROOT', os.path.join(BASE_DIR, 'import_uploads'))
+# A job that has recorded no progress for this long lost its worker (see
+# plants.jobs.recover_import_jobs)
+PLANTS_IMPORT_STALE_SECONDS = int(os.environ.get('PLANTS_IMPORT_STALE_SECONDS', 600))
+# Processes validating the rows of large uploads (plants.importers); 1
+# validates in the importing process
+PLANTS_IMPORT_VALIDATION_PROCESSES = int(
+    os.environ.get('PLANTS_IMPORT_VALIDATION_PROCESSES', os.cpu_count() or 1)
+)
+
+# SQLite file of the Node app, whose users table sync_nursery_profiles reads
+# nursery locations from
+PLANTS_NODE_DATABASE = os.environ.get('PLANTS_NODE_DATABASE', os.path.join(BASE_DIR.parent, 'sqlite.db'))
+
+# Background image resizing (plants.renditions)
+PLANTS_RENDITION_WORKERS = int(os.environ.get('PLANTS_RENDITION_WORKERS', 2))
+
+# Catalog response cache; 0 disables it. gunicorn.conf.py turns it off when
+# several workers would each have their own local-memory cache
+PLANTS_CACHE_TIMEOUT = int(os.environ.get('PLANTS_CACHE_TIMEOUT', 300))
+
+# Read per-plant inventory totals from the materialized PlantAvailability
+# table instead of aggregating PlantInventory on every list query
+PLANTS_AVAILABILITY_SUMMARY = os.environ.get('PLANTS_AVAILABILITY_SUMMARY', '').lower() == 'true'
+
+# Render plant and inventory list pages from .values() rows through a
+# compiled serializer (plants.fast_lists) instead of one instance per row.
+# The pages are then encoded with orjson when the fast-json extra is
+# installed (plants.renderers), and with the stdlib json module otherwise.
+PLANTS_FAST_LISTS = os.environ.get('PLANTS_FAST_LISTS', '').lower() == 'true'
+
+# Neighbours stored per plant for /api/plants/<id>/similar/ (plants.similarity)
+PLANTS_SIMILAR_COUNT = int(os.environ.get('PLANTS_SIMILAR_COUNT', 10))
+
+# Seconds a stock reservation holds inventory before it is released
+PLANTS_RESERVATION_TTL = int(os.environ.get('PLANTS_RESERVATION_TTL', 900))
+
+# Change feeds (plants.changes): rows younger than this many seconds are held
+# back until in-flight transactions have committed, and deletions are kept
+# this many days for clients to catch up
+PLANTS_CHANGES_SETTLE_SECONDS = int(os.environ.get('PLANTS_CHANGES_SETTLE_SECONDS', 5))
+PLANTS_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('PLANTS_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Per-route request metrics (plants.instrumentation), served at /metrics to
+# PLANTS_METRICS_ALLOWED_IPS. Requests over either budget are logged.
+PLANTS_INSTRUMENTATION = os.environ.get('PLANTS_INSTRUMENTATION', '').lower() == 'true'
+PLANTS_METRICS_ALLOWED_IPS = os.environ.get('PLANTS_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+PLANTS_QUERY_BUDGET = int(os.environ.get('PLANTS_QUERY_BUDGET', 20))
+PLANTS_LATENCY_BUDGET_MS = int(os.environ.get('PLANTS_LATENCY_BUDGET_MS', 500))
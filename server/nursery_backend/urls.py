@@ -1,15 +1,31 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import routers
-from plants.views import PlantViewSet, PlantInventoryViewSet
+from plants.async_views import AsyncInventoryList, AsyncPlantDetail, AsyncPlantList
+from plants.instrumentation import metrics_view
+from plants.storage import BLOB_PREFIX
+from plants.views import (
+    PlantViewSet, PlantInventoryViewSet, ImportJobViewSet, StockReservationViewSet,
+    serve_image_blob
+)
 
 router = routers.DefaultRouter()
+# Registered before 'plants' so the plant detail route doesn't swallow it
+router.register(r'plants/import-jobs', ImportJobViewSet)
 router.register(r'plants', PlantViewSet)
 router.register(r'inventory', PlantInventoryViewSet)
+router.register(r'reservations', StockReservationViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Async read path for catalog browsing; pays off when served over ASGI
+    path('api/async/plants/', AsyncPlantList.as_view()),
+    path('api/async/plants/<int:pk>/', AsyncPlantDetail.as_view()),
+    path('api/async/inventory/', AsyncInventoryList.as_view()),
     path('api/', include(router.urls)),
+    path('metrics', metrics_view),
+    # Served with immutable cache headers; put a CDN or web server in front
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}{BLOB_PREFIX}(?P<path>.+)$', serve_image_blob),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
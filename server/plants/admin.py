@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Plant, PlantImage, PlantInventory
+from .models import Plant, PlantImage, PlantInventory, ImportJob, NurseryProfile, StockReservation
+from .reservations import release
+from .renditions import thumbnail_url
 
 class PlantImageInline(admin.TabularInline):
     model = Plant.additional_images.through
@@ -52,7 +54,8 @@ class PlantAdmin(admin.ModelAdmin):
 
     def display_main_image(self, obj):
         if obj.main_image:
-            return format_html('<img src="{}" width="50" height="50" />', obj.main_image.url)
+            return format_html('<img src="{}" width="50" height="50" />',
+                               thumbnail_url(obj.main_image, obj.main_image_renditions))
         return "No image"
     display_main_image.short_description = 'Image'
 
@@ -63,7 +66,8 @@ class PlantImageAdmin(admin.ModelAdmin):
 
     def display_image(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="50" height="50" />', obj.image.url)
+            return format_html('<img src="{}" width="50" height="50" />',
+                               thumbnail_url(obj.image, obj.renditions))
         return "No image"
     display_image.short_description = 'Image'
 
@@ -72,4 +76,28 @@ class PlantInventoryAdmin(admin.ModelAdmin):
     list_display = ('plant', 'nursery', 'quantity', 'price', 'size', 'updated_at')
     list_filter = ('nursery', 'size')
     search_fields = ('plant__common_name', 'plant__scientific_name', 'nursery__username')
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(NurseryProfile)
+class NurseryProfileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'nursery', 'latitude', 'longitude', 'service_radius', 'updated_at')
+    search_fields = ('name', 'nursery__username', 'address')
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'rows_processed', 'rows_created', 'error_count',
+                   'created_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at')
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'inventory', 'quantity', 'status', 'reserved_by', 'expires_at', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('inventory', 'quantity', 'status', 'reserved_by', 'created_at', 'updated_at')
+    actions = ['release_reservations']
+
+    def release_reservations(self, request, queryset):
+        released = release(list(queryset))
+        self.message_user(request, f"Released {len(released)} reservations")
+    release_reservations.short_description = 'Release selected reservations'
@@ -0,0 +1,136 @@
+"""Async versions of the read-only catalog endpoints.
+
+Plant list, search and retrieve and the inventory list are served from
+``/api/async/`` by plain Django async views that read through the async
+ORM. Under an ASGI server (see ``nursery_backend/asgi.py``) a request
+waiting on the database then holds no worker thread, so many slow
+catalog reads can be in flight at once. Querysets, filters, pagination,
+serializers, the response cache and the JSON renderer are the same as for
+the DRF viewsets, so both paths return identical bytes, bar the path in
+pagination links. Authentication is never looked at: these endpoints
+only serve what anonymous users may read anyway.
+
+Under WSGI the views still work, but each request then runs its own event
+loop and there is nothing to gain over the sync path.
+"""
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+
+from .cache import aget_versions, etag_matches, get_cache, response_cache_key, response_etag
+from .models import NurseryProfile, Plant, PlantImage, PlantInventory
+from .renderers import FastJSONRenderer
+from .views import PlantInventoryViewSet, PlantViewSet
+
+
+def json_response(data, status=200):
+    """Render ``data`` with the viewsets' renderer, so the bytes match theirs"""
+    return HttpResponse(FastJSONRenderer().render(data), status=status,
+                        content_type='application/json')
+
+
+def error_response(exc):
+    detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return json_response(detail, status=exc.status_code)
+
+
+class AsyncCatalogView(View):
+    """Serve one GET action of ``viewset_class`` asynchronously"""
+    viewset_class = None
+    action = None
+    cache_models = (Plant, PlantImage, PlantInventory, NurseryProfile)
+
+    async def get(self, request, **kwargs):
+        viewset = self.get_viewset(request, kwargs)
+        try:
+            return await self.cached(viewset)
+        except APIException as exc:
+            return error_response(exc)
+
+    def get_viewset(self, request, kwargs):
+        """A viewset instance for building querysets and serializers only"""
+        viewset = self.viewset_class(action_map={'get': self.action}, format_kwarg=None,
+                                     args=(), kwargs=kwargs)
+        viewset.request = viewset.initialize_request(request, **kwargs)
+        viewset.action = self.action
+        return viewset
+
+    async def cached(self, viewset):
+        """What ``cache_response`` does for the viewsets, with async cache calls"""
+        timeout = getattr(settings, 'PLANTS_CACHE_TIMEOUT', 300)
+        if not timeout:
+            return json_response(await self.render(viewset))
+
+        request = viewset.request
+        key = response_cache_key(request, self.cache_models, await aget_versions(self.cache_models))
+        etag = response_etag(key)
+        if etag_matches(request, etag):
+            return self.not_modified(etag)
+
+        cache = get_cache()
+        cached = await cache.aget(key)
+        if cached is None:
+            cached = {'data': await self.render(viewset)}
+            await cache.aset(key, cached, timeout)
+
+        response = json_response(cached['data'])
+        response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def not_modified(etag):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    def get_queryset(self, viewset):
+        return viewset.filter_queryset(viewset.get_queryset())
+
+    async def render(self, viewset):
+        raise NotImplementedError
+
+
+class AsyncListView(AsyncCatalogView):
+    action = 'list'
+
+    async def render(self, viewset):
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(self.get_queryset(viewset), viewset.request, view=viewset)
+        return paginator.get_paginated_response(viewset.get_serializer(page, many=True).data).data
+
+
+class AsyncDetailView(AsyncCatalogView):
+    action = 'retrieve'
+
+    def get_queryset(self, viewset):
+        return super().get_queryset(viewset).filter(pk=viewset.kwargs['pk'])
+
+    async def render(self, viewset):
+        queryset = self.get_queryset(viewset)
+        try:
+            instance = await queryset.aget()
+        except ObjectDoesNotExist:
+            # The message get_object_or_404 gives the viewsets
+            raise NotFound(f'No {queryset.model._meta.object_name} matches the given query.')
+        return viewset.get_serializer(instance).data
+
+
+class AsyncPlantList(AsyncListView):
+    """``GET /api/plants/``, including ``?search=``, filters and ``?facets=true``"""
+    viewset_class = PlantViewSet
+
+    async def render(self, viewset):
+        data = await super().render(viewset)
+        if viewset.request.query_params.get('facets', '').lower() == 'true':
+            data['facets'] = await viewset.get_filterset().afacet_counts(viewset.get_base_queryset())
+        return data
+
+
+class AsyncPlantDetail(AsyncDetailView):
+    viewset_class = PlantViewSet
+
+
+class AsyncInventoryList(AsyncListView):
+    viewset_class = PlantInventoryViewSet
@@ -0,0 +1,132 @@
+"""Structured values parsed from free-text plant and inventory fields.
+
+``Plant.hardiness_zone`` becomes a USDA zone range and
+``PlantInventory.seasonal_availability`` a bitmask of months, stored in
+indexed columns next to the text (see ``Plant.fill_hardiness_zone`` and
+``PlantInventory.fill_available_months``) so ``?zone=`` and ``?month=``
+filter in SQL.
+
+Zones are read as USDA numbers, ``"10-12"``, ``"5a-9b"`` or ``"USDA 7"``, or
+as RHS ratings, ``"H5"``, which are translated to the USDA zone with the same
+winter minimum. A single zone means hardy from that zone up. Months are read
+from month names and seasons, alone, in lists or in ranges such as
+``"March-June"`` or ``"spring to early summer"``; seasons are northern
+hemisphere ones. Text that can't be read gives None.
+"""
+import re
+
+MIN_ZONE, MAX_ZONE = 1, 13
+
+# RHS hardiness rating -> coldest USDA zone with the same winter minimum
+RHS_ZONES = {
+    'h1a': 13, 'h1b': 12, 'h1c': 11, 'h1': 11, 'h2': 10, 'h3': 9, 'h4': 8,
+    'h5': 7, 'h6': 6, 'h7': 5,
+}
+
+MONTHS = (
+    'january', 'february', 'march', 'april', 'may', 'june', 'july',
+    'august', 'september', 'october', 'november', 'december',
+)
+ALL_MONTHS = (1 << 12) - 1
+# Season -> (first month, last month), 1-based
+SEASONS = {
+    'spring': (3, 5),
+    'summer': (6, 8),
+    'autumn': (9, 11),
+    'fall': (9, 11),
+    'winter': (12, 2),
+}
+YEAR_ROUND = re.compile(r'\b(year[\s-]*round|all[\s-]*year|always)\b')
+RANGE_WORDS = {'-', '–', '—', 'to', 'through', 'thru', 'until', 'till'}
+
+
+def parse_hardiness_zone(text):
+    """(min zone, max zone) of a hardiness zone text, or (None, None)"""
+    text = (text or '').lower()
+    rhs = re.search(r'\bh[1-7][abc]?\b', text)
+    if rhs:
+        zone = RHS_ZONES.get(rhs.group(), RHS_ZONES.get(rhs.group()[:2]))
+        return zone, MAX_ZONE
+    zones = [int(number) for number in re.findall(r'(\d+)[ab]?', text)]
+    if not zones or not all(MIN_ZONE <= zone <= MAX_ZONE for zone in zones):
+        return None, None
+    if len(zones) == 1:
+        return zones[0], MAX_ZONE
+    return min(zones), max(zones)
+
+
+def month_number(word):
+    """1-12 for a month name or its abbreviation of three letters or more, else None"""
+    if len(word) >= 3:
+        for number, name in enumerate(MONTHS, 1):
+            if name.startswith(word) or (word == 'sept' and number == 9):
+                return number
+    return None
+
+
+def month_span(word):
+    """(first month, last month) a word names, or None"""
+    if word in SEASONS:
+        return SEASONS[word]
+    number = month_number(word)
+    return (number, number) if number else None
+
+
+def months_mask(first, last):
+    """Bitmask of the months from ``first`` to ``last``, wrapping past December"""
+    mask, month = 0, first
+    while True:
+        mask |= month_bit(month)
+        if month == last:
+            return mask
+        month = month % 12 + 1
+
+
+def month_bit(month):
+    return 1 << (month - 1)
+
+
+def parse_available_months(text):
+    """Bitmask of the months a seasonal availability text covers, or None.
+
+    Blank text means no restriction, i.e. every month.
+    """
+    text = (text or '').strip().lower()
+    if not text or YEAR_ROUND.search(text):
+        return ALL_MONTHS
+    mask = 0
+    found = False
+    start = None      # first month of the span that may open a range
+    in_range = False  # a range word follows that span
+    for token in re.findall(r'[a-z]+|[-–—]', text):
+        if token in RANGE_WORDS:
+            in_range = start is not None
+            continue
+        span = month_span(token)
+        if span is None:
+            continue
+        found = True
+        if in_range:
+            mask |= months_mask(start, span[1])
+            in_range = False
+        else:
+            mask |= months_mask(*span)
+        start = span[0]
+    return mask if found else None
+
+
+def parse_month(value):
+    """A ``?month=`` value, 1-12 or a month name, as 1-12; ValueError otherwise"""
+    value = value.strip().lower()
+    number = int(value) if value.isdigit() else month_number(value)
+    if number is None or not 1 <= number <= 12:
+        raise ValueError(value)
+    return number
+
+
+def parse_zone(value):
+    """A ``?zone=`` value as a USDA zone number; ValueError otherwise"""
+    match = re.fullmatch(r'(\d+)[ab]?', value.strip().lower())
+    if not match or not MIN_ZONE <= int(match.group(1)) <= MAX_ZONE:
+        raise ValueError(value)
+    return int(match.group(1))
@@ -0,0 +1,82 @@
+"""Per-plant inventory totals: stock, price range and number of nurseries.
+
+List pages read them either with one grouped aggregate over PlantInventory
+or, when ``PLANTS_AVAILABILITY_SUMMARY`` is on, from the PlantAvailability
+table with a single join. The table is refreshed on every inventory write so
+it can be switched on at any time; ``refresh_availability`` rebuilds it.
+Reservations adjust it in place instead (see ``plants.reservations``).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.utils import timezone
+
+from .models import Plant, PlantAvailability, PlantInventory
+
+AVAILABILITY_FIELDS = ('total_quantity', 'min_price', 'max_price', 'nursery_count')
+# Plants per transaction when rebuilding every summary
+REBUILD_BATCH_SIZE = 500
+
+
+def annotate_availability(queryset):
+    """Annotate plants with AVAILABILITY_FIELDS in the same query"""
+    if getattr(settings, 'PLANTS_AVAILABILITY_SUMMARY', False):
+        return queryset.annotate(**{
+            field: F(f'availability__{field}') for field in AVAILABILITY_FIELDS
+        })
+    return queryset.annotate(
+        total_quantity=Sum('plantinventory__quantity'),
+        min_price=Min('plantinventory__price'),
+        max_price=Max('plantinventory__price'),
+        nursery_count=Count('plantinventory__nursery', distinct=True),
+    )
+
+
+def refresh_availability(plant_ids=None, batch_size=REBUILD_BATCH_SIZE):
+    """Recompute summary rows for ``plant_ids`` (every plant if None).
+
+    The plants' rows are locked first, so concurrent refreshes of a plant
+    run one after the other, and then their inventory rows, so the totals
+    can't miss a reservation's stock change that is still in flight (see
+    ``reservations.adjust_stock``). Summaries are upserted rather than
+    deleted and recreated. A full rebuild goes through the plants in id
+    order, ``batch_size`` at a time, each batch in its own transaction so
+    it never holds locks over the whole catalog.
+    """
+    if plant_ids is None:
+        last_id = 0
+        while batch := list(
+            Plant.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        ):
+            refresh_availability(batch)
+            last_id = batch[-1]
+        return
+
+    plant_ids = list(plant_ids)
+    if not plant_ids:
+        return
+    plants = Plant.objects.filter(pk__in=plant_ids)
+    inventory = PlantInventory.objects.filter(plant_id__in=plant_ids)
+    summaries = PlantAvailability.objects.filter(plant_id__in=plant_ids)
+
+    with transaction.atomic():
+        # In id order, like adjust_stock, so lockers can't deadlock
+        list(plants.select_for_update().order_by('pk').values_list('pk', flat=True))
+        list(inventory.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+        now = timezone.now()
+        totals = inventory.values('plant').annotate(
+            total_quantity=Sum('quantity'),
+            min_price=Min('price'),
+            max_price=Max('price'),
+            nursery_count=Count('nursery', distinct=True),
+        ).order_by()
+        rows = [PlantAvailability(plant_id=row.pop('plant'), updated_at=now, **row) for row in totals]
+        summaries.exclude(plant_id__in=inventory.values('plant_id')).delete()
+        PlantAvailability.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['plant'],
+            update_fields=[*AVAILABILITY_FIELDS, 'updated_at'],
+            batch_size=1000,
+        )
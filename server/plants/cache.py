@@ -0,0 +1,140 @@
+"""Response caching for catalog reads.
+
+Every cached response is keyed on the request URL and on a version number
+per table it reads from. Writes bump the version of their table (see
+``plants.signals`` and the CSV importer), which orphans every cached response
+built from the old data without having to find and delete them. The ETag is
+derived from the same key, so a conditional GET that matches is answered
+with 304 before touching the database.
+
+There is no Last-Modified: a date taken from the rows a response reads
+misses deletions and changes to related tables, which the versions catch.
+If-Modified-Since is therefore ignored and only If-None-Match can give a 304.
+
+Versions live in the configured cache. With the default local-memory cache
+they are per process, so deployments running several worker processes should
+point ``CACHES`` at a shared backend such as Redis; ``gunicorn.conf.py``
+turns response caching off when they don't.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[getattr(settings, 'PLANTS_CACHE_ALIAS', 'default')]
+
+
+def version_key(model):
+    return f'plants:version:{model._meta.db_table}'
+
+
+def get_versions(models):
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, timeout=None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(models):
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, 1, timeout=None)
+            versions[key] = await cache.aget(key, 1)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model):
+    """Invalidate every cached response that read from ``model``'s table"""
+    cache = get_cache()
+    key = version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 2, timeout=None)
+
+
+def bump_version_on_commit(model):
+    # Bumping before commit would let a reader cache the old rows again
+    transaction.on_commit(lambda: bump_version(model))
+
+
+def response_cache_key(request, models, versions=None):
+    if versions is None:
+        versions = get_versions(models)
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{params}'
+    version = '.'.join(str(version) for version in versions)
+    digest = hashlib.md5(url.encode()).hexdigest()
+    return f'plants:response:{version}:{digest}'
+
+
+def response_etag(key):
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+
+def etag_matches(request, etag):
+    """Whether the request's If-None-Match names ``etag`` (weak comparison)"""
+    tags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in tags or etag in (tag.removeprefix('W/') for tag in tags)
+
+
+def cache_response(*models):
+    """Cache a viewset action's response data until any of ``models`` change.
+
+    Sets an ETag and answers conditional GETs that match it with 304.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            timeout = getattr(settings, 'PLANTS_CACHE_TIMEOUT', 300)
+            if not timeout:
+                return method(self, request, *args, **kwargs)
+
+            key = response_cache_key(request, models)
+            etag = response_etag(key)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cached = {
+                    'data': response.data,
+                    'plain_json': getattr(response, 'plain_json', False),
+                }
+                cache.set(key, cached, timeout)
+            else:
+                response = Response(cached['data'])
+                response.plain_json = cached.get('plain_json', False)
+
+            response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
+
+
+def not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,143 @@
+"""Incremental change feeds for plants and inventory.
+
+``/api/plants/changes/`` and ``/api/inventory/changes/`` return the rows
+updated after a cursor, in ``(updated_at, id)`` order off the keyset
+indexes, along with the ids deleted since, read from the DeletedRecord
+tombstones. Each response carries a ``cursor`` to send back on the next
+call. Start with ``?updated_since=<ISO 8601>``, or with neither for a full
+first sync.
+
+Rows are only handed out once they are ``PLANTS_CHANGES_SETTLE_SECONDS``
+old. ``updated_at`` is stamped before a transaction commits, so a write
+still in flight can carry an earlier timestamp than one already visible;
+holding back the last few seconds keeps it from landing behind a cursor
+that has already moved on.
+"""
+import base64
+import json
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+
+from .models import DeletedRecord, Plant, PlantInventory
+
+FEED_KINDS = {
+    Plant: 'plant',
+    PlantInventory: 'inventory',
+}
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Cursor is older than the deletion history; run a full sync"
+    default_code = 'cursor_expired'
+
+
+def record_deletion(model, object_id):
+    DeletedRecord.objects.create(kind=FEED_KINDS[model], object_id=object_id)
+
+
+def prune_deletions(now=None):
+    """Drop tombstones older than PLANTS_TOMBSTONE_RETENTION_DAYS"""
+    return DeletedRecord.objects.filter(deleted_at__lt=get_retention_cutoff(now)).delete()[0]
+
+
+def get_retention_cutoff(now=None):
+    days = getattr(settings, 'PLANTS_TOMBSTONE_RETENTION_DAYS', 30)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def encode_cursor(updated, deleted):
+    payload = json.dumps({
+        'u': [updated[0].isoformat(), updated[1]] if updated else None,
+        'd': [deleted[0].isoformat(), deleted[1]],
+    }, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(value):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(value.encode()))
+        positions = []
+        for name in ('u', 'd'):
+            if payload[name] is None and name == 'u':
+                positions.append(None)
+                continue
+            moment, pk = payload[name]
+            moment = parse_datetime(moment)
+            if moment is None:
+                raise ValueError(name)
+            positions.append((moment, int(pk)))
+        return positions
+    except (TypeError, ValueError, KeyError):
+        raise NotFound("Invalid cursor")
+
+
+def after(position, field):
+    """Rows past ``position`` on ``(field, id)``, in a form the index can seek"""
+    moment, pk = position
+    return Q(**{f'{field}__gte': moment}) & (
+        Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk})
+    )
+
+
+def read_changes(queryset, query_params):
+    """Read one page of a change feed for ``queryset``'s model.
+
+    Returns a dict with ``changed`` (model instances), ``deleted`` (ids),
+    ``cursor`` and ``has_more``.
+    """
+    until = timezone.now() - timedelta(seconds=getattr(settings, 'PLANTS_CHANGES_SETTLE_SECONDS', 5))
+    try:
+        limit = min(int(query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        raise ValidationError({'limit': "Must be a number"})
+    if limit <= 0:
+        raise ValidationError({'limit': "Must be positive"})
+
+    if query_params.get('cursor'):
+        updated, deleted = decode_cursor(query_params['cursor'])
+    elif query_params.get('updated_since'):
+        since = parse_datetime(query_params['updated_since'])
+        if since is None:
+            raise ValidationError({'updated_since': "Expected an ISO 8601 date and time"})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, dt_timezone.utc)
+        updated = deleted = (since, 0)
+    else:
+        # A full sync starts from the first row and has nothing to delete
+        # yet; deletions are picked up from the moment it started.
+        updated = None
+        deleted = (until, 0)
+
+    if deleted[0] < get_retention_cutoff():
+        raise CursorExpired()
+
+    if updated is not None:
+        queryset = queryset.filter(after(updated, 'updated_at'))
+    changed = list(queryset.filter(updated_at__lte=until).order_by('updated_at', 'id')[:limit + 1])
+    tombstones = list(
+        DeletedRecord.objects.filter(
+            after(deleted, 'deleted_at'), kind=FEED_KINDS[queryset.model], deleted_at__lte=until
+        ).order_by('deleted_at', 'id').values_list('deleted_at', 'id', 'object_id')[:limit + 1]
+    )
+    has_more = len(changed) > limit or len(tombstones) > limit
+    changed, tombstones = changed[:limit], tombstones[:limit]
+
+    if changed:
+        updated = (changed[-1].updated_at, changed[-1].pk)
+    if tombstones:
+        deleted = tombstones[-1][:2]
+    return {
+        'changed': changed,
+        'deleted': [object_id for _, _, object_id in tombstones],
+        'cursor': encode_cursor(updated, deleted),
+        'has_more': has_more,
+    }
@@ -0,0 +1,29 @@
+"""Process-wide thread pools for background work (imports, image renditions,
+similar plants)"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+# pool name -> (setting holding its size, default size)
+POOLS = {
+    'import': ('PLANTS_IMPORT_WORKERS', 2),
+    'renditions': ('PLANTS_RENDITION_WORKERS', 2),
+    # Similar plant refreshes rewrite shared rows, so they run one at a time
+    'similarity': ('PLANTS_SIMILARITY_WORKERS', 1),
+}
+
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def get_executor(pool='import'):
+    """Return a process-wide background pool, creating it lazily"""
+    with _executor_lock:
+        if pool not in _executors:
+            setting, default = POOLS[pool]
+            _executors[pool] = ThreadPoolExecutor(
+                max_workers=getattr(settings, setting, default),
+                thread_name_prefix=f'plant-{pool}',
+            )
+    return _executors[pool]
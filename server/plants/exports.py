@@ -0,0 +1,150 @@
+"""Streaming CSV and NDJSON exports of plants and inventory.
+
+``/api/plants/export/`` and ``/api/inventory/export/`` write every row
+matching the list filters, however many there are, without building pages:
+rows are read from a server-side cursor ``EXPORT_CHUNK_SIZE`` at a time and
+flushed to the client as they are encoded, so memory stays flat.
+
+CSV is the default; ``?format=ndjson`` or ``Accept: application/x-ndjson``
+gives one JSON object per line instead. The columns are the ones the
+importers read: a plant export can be fed back to ``upload_csv`` and an
+inventory export to ``inventory/bulk/``. Extra columns such as ``id`` are
+ignored on the way back in.
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from .importers import BOOLEAN_COLUMNS, CSV_DEFAULTS
+from .inventory_sync import SYNC_FIELDS
+
+EXPORT_CHUNK_SIZE = 2000
+# Encoded output is sent on once this many characters have built up
+FLUSH_SIZE = 64 * 1024
+
+PLANT_EXPORT_COLUMNS = (
+    'id', 'common_name', 'scientific_name', 'description',
+    *CSV_DEFAULTS, *BOOLEAN_COLUMNS,
+)
+INVENTORY_EXPORT_COLUMNS = ('id', 'nursery_id', 'plant_id', 'size', *SYNC_FIELDS)
+
+
+class CSVEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def start(self):
+        self.writer.writerow(self.columns)
+
+    def write(self, row):
+        self.writer.writerow([self.cell(value) for value in row])
+
+    @staticmethod
+    def cell(value):
+        # The importer reads flags as true/false and empty cells as defaults
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return value
+
+    def pending(self):
+        return self.buffer.tell()
+
+    def flush(self):
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+class NDJSONEncoder(CSVEncoder):
+    def start(self):
+        pass
+
+    def write(self, row):
+        self.buffer.write(json.dumps(dict(zip(self.columns, row)), cls=DjangoJSONEncoder))
+        self.buffer.write('\n')
+
+
+ENCODERS = {
+    'csv': CSVEncoder,
+    'ndjson': NDJSONEncoder,
+}
+
+
+class ExportRenderer(BaseRenderer):
+    """Selects an export format through content negotiation.
+
+    Exports stream their own body, so this only renders what the view
+    returns as a ``Response``, i.e. errors.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        rows = [row if isinstance(row, dict) else {'detail': row} for row in rows]
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        encoder = ENCODERS[self.format](columns)
+        encoder.start()
+        for row in rows:
+            encoder.write([row.get(column) for column in columns])
+        return encoder.flush()
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+EXPORT_RENDERERS = [CSVRenderer, NDJSONRenderer]
+
+
+def stream_rows(rows, encoder):
+    encoder.start()
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        encoder.write(row)
+        if encoder.pending() >= FLUSH_SIZE:
+            yield encoder.flush()
+    yield encoder.flush()
+
+
+async def astream_rows(rows, encoder):
+    """``stream_rows`` for ASGI servers, each chunk produced in a worker thread"""
+    chunks = stream_rows(rows, encoder)
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def export_response(request, queryset, columns, name):
+    """Stream ``columns`` of ``queryset`` in the negotiated format"""
+    renderer = request.accepted_renderer
+    if not queryset.ordered:
+        queryset = queryset.order_by('id')
+    rows = queryset.prefetch_related(None).values_list(*columns)
+    encoder = ENCODERS[renderer.format](columns)
+    # An ASGI server reads a sync iterator into memory in one go before
+    # sending any of it, so give it an async one there
+    if isinstance(request._request, ASGIRequest):
+        content = astream_rows(rows, encoder)
+    else:
+        content = stream_rows(rows, encoder)
+    response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{name}.{renderer.format}"'
+    return response
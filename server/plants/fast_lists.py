@@ -0,0 +1,217 @@
+"""High-throughput list rendering for plants and inventory.
+
+With ``PLANTS_FAST_LISTS`` on, list actions skip building model instances
+and running ``ModelSerializer.to_representation`` row by row. Instead the
+serializer the view would have used is compiled once per request into a
+flat list of per-field encoders:
+
+* plain columns (text, integers, booleans, choices) are copied as they are
+* other columns go straight to their DRF field's ``to_representation``
+* image fields become URLs through their storage
+* method fields get the row
+* nested serializers become a join (foreign keys) or one extra query
+  (many-to-many)
+
+These encoders are applied to ``.values()`` rows. The result is the same
+data the serializer would produce. When every value in it is known to
+encode identically, FastJSONRenderer writes it with orjson. A serializer
+with a field this can't compile makes the view fall back to the regular
+path.
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .instrumentation import current_stats
+from .renderers import is_plain
+
+# Fields whose to_representation returns DB values of these types unchanged
+PASSTHROUGH = {
+    serializers.CharField.to_representation,
+    serializers.ChoiceField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.BooleanField.to_representation,
+}
+OWNER_KEY = '_fast_owner'
+
+
+class Unsupported(Exception):
+    pass
+
+
+class Row:
+    """Attribute access to a ``.values()`` row, for SerializerMethodFields"""
+    __slots__ = ('row', 'prefix')
+
+    def __init__(self, row, prefix=''):
+        self.row = row
+        self.prefix = prefix
+
+    def __getattr__(self, name):
+        try:
+            return self.row[self.prefix + name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class CompiledSerializer:
+    """Renders ``.values()`` rows the way ``serializer`` renders instances.
+
+    Columns of related rows are read under ``prefix``, as in
+    ``values('plant__common_name')``. ``columns`` lists every column the
+    encoders read. ``related`` collects the many-to-many fields of this
+    serializer and of the ones nested through foreign keys, which
+    ``load_related`` fills in.
+    """
+
+    def __init__(self, serializer, prefix='', related=None):
+        self.prefix = prefix
+        self.opts = serializer.Meta.model._meta
+        self.columns = [f'{prefix}id']
+        self.related = [] if related is None else related
+        # Output fields that may hold values orjson can't write exactly
+        self.checked = []
+        self.nested = []
+        self.encoders = [
+            (field.field_name, self.compile_field(serializer, field))
+            for field in serializer._readable_fields
+        ]
+
+    def compile_field(self, serializer, field):
+        prefix = self.prefix
+        if isinstance(field, serializers.SerializerMethodField):
+            method = getattr(serializer, field.method_name)
+            self.checked.append(field.field_name)
+            return lambda row: method(Row(row, prefix))
+
+        try:
+            model_field = self.opts.get_field(field.source)
+        except FieldDoesNotExist:
+            raise Unsupported(field.field_name)
+        key = prefix + model_field.name
+
+        if isinstance(field, serializers.ListSerializer):
+            if not (model_field.many_to_many and model_field.concrete):
+                raise Unsupported(field.field_name)
+            # Fetched separately, so it collects its own many-to-many fields
+            nested = CompiledSerializer(field.child)
+            self.related.append((f'{prefix}id', key, model_field, nested))
+            self.nested.append((field.field_name, nested, True))
+            return lambda row: row[key]
+
+        if isinstance(field, serializers.BaseSerializer):
+            if not (model_field.many_to_one and model_field.concrete):
+                raise Unsupported(field.field_name)
+            nested = CompiledSerializer(field, prefix=f'{key}__', related=self.related)
+            self.columns.extend(nested.columns)
+            self.nested.append((field.field_name, nested, False))
+            nested_id = f'{key}__id'
+            return lambda row: None if row[nested_id] is None else nested.encode(row)
+
+        if model_field.is_relation or not model_field.concrete:
+            raise Unsupported(field.field_name)
+        self.columns.append(key)
+
+        if type(field).to_representation in PASSTHROUGH:
+            return lambda row: row[key]
+
+        self.checked.append(field.field_name)
+        if isinstance(field, serializers.FileField):
+            storage = model_field.storage
+            request = field.context.get('request')
+            if not getattr(field, 'use_url', True):
+                return lambda row: row[key] or None
+
+            def file_url(row):
+                name = row[key]
+                if not name:
+                    return None
+                url = storage.url(name)
+                return request.build_absolute_uri(url) if request is not None else url
+            return file_url
+
+        to_representation = field.to_representation
+        return lambda row: None if row[key] is None else to_representation(row[key])
+
+    def encode(self, row):
+        return {name: encode(row) for name, encode in self.encoders}
+
+    def is_plain(self, item):
+        """True if FastJSONRenderer may write ``item`` with orjson"""
+        if not all(is_plain(item[name]) for name in self.checked):
+            return False
+        for name, nested, many in self.nested:
+            value = item[name]
+            if value is None:
+                continue
+            if not all(nested.is_plain(child) for child in (value if many else [value])):
+                return False
+        return True
+
+    def load_related(self, rows):
+        """Fetch many-to-many rows for ``rows``, one query per field"""
+        for owner_key, key, model_field, nested in self.related:
+            owners = {row[owner_key] for row in rows if row[owner_key] is not None}
+            lookup = model_field.related_query_name()
+            related_rows = list(model_field.related_model.objects.filter(
+                **{f'{lookup}__in': owners}
+            ).values(*nested.columns, **{OWNER_KEY: F(lookup)}))
+            by_owner = defaultdict(list)
+            for related in related_rows:
+                by_owner[related[OWNER_KEY]].append(related)
+            nested.load_related(related_rows)
+            for row in rows:
+                row[key] = [nested.encode(related) for related in by_owner.get(row[owner_key], ())]
+
+
+def fast_lists_enabled():
+    return getattr(settings, 'PLANTS_FAST_LISTS', False)
+
+
+class FastListMixin:
+    """Serve ``list`` through a compiled serializer when PLANTS_FAST_LISTS is on"""
+
+    def list(self, request, *args, **kwargs):
+        if fast_lists_enabled():
+            response = self.fast_list()
+            if response is not None:
+                return response
+        return super().list(request, *args, **kwargs)
+
+    def fast_list(self):
+        """The list response, or None if the serializer can't be compiled"""
+        try:
+            compiled = CompiledSerializer(self.get_serializer(many=True).child)
+        except Unsupported:
+            return None
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        columns = set(compiled.columns) | set(queryset.query.annotation_select)
+        # The keyset paginator orders and builds cursors on these
+        columns |= set(getattr(self.paginator, 'orderings', ()))
+        rows = queryset.values(*columns)
+        if queryset.query.group_by is True:
+            # values() after an aggregate annotation (availability) groups by
+            # every column of the model; group by the selected ones instead,
+            # as the instance queryset does
+            rows.query.group_by = True
+        # Counting the instance queryset needs no GROUP BY on the values columns
+        page = self.paginator.paginate_queryset(rows, self.request, view=self, count_queryset=queryset)
+        rows = list(rows) if page is None else page
+
+        compiled.load_related(rows)
+        stats = current_stats.get()
+        started = time.perf_counter()
+        data = [compiled.encode(row) for row in rows]
+        plain = all(compiled.is_plain(item) for item in data)
+        if stats is not None:
+            stats.serializer_time += time.perf_counter() - started
+
+        response = self.get_paginated_response(data) if page is not None else Response(data)
+        response.plain_json = plain
+        return response
@@ -0,0 +1,184 @@
+"""Faceted filtering for the plant catalog.
+
+Filters come from the query string:
+
+* choice fields accept several values, comma separated or repeated, e.g.
+  ``?light_requirement=low,medium&water_requirement=low``
+* flags accept ``true``/``false``, e.g. ``?drought_tolerant=true``
+* ranges: ``price_min``/``price_max``, ``height_min``/``height_max`` (mature
+  height in cm), ``temperature_low`` (plant survives down to this many
+  degrees) and ``temperature_high`` (plant survives up to this many degrees)
+* ``zone`` (USDA hardiness zone the plant is hardy in) and ``month`` (1-12
+  or a name; some nursery stocks the plant then), read from the columns
+  plants.attributes parses out of the free-text fields
+
+Facet counts are computed in one aggregate query. Each facet is counted with
+every filter applied except its own, so the storefront can show how many
+results picking another value would give.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.lookups import Exact
+from rest_framework.exceptions import ValidationError
+
+from .attributes import MAX_ZONE, MIN_ZONE, month_bit, parse_month, parse_zone
+from .models import Plant, PlantInventory
+
+CHOICE_FILTERS = {
+    'light_requirement': Plant.LIGHT_CHOICES,
+    'water_requirement': Plant.WATER_CHOICES,
+    'growth_rate': Plant.GROWTH_RATE_CHOICES,
+    'flowering_season': Plant.SEASON_CHOICES,
+}
+
+BOOLEAN_FILTERS = (
+    'indoor_suitable', 'drought_tolerant', 'deer_resistant', 'edible',
+    'pest_resistant', 'fragrant',
+)
+
+# query parameter -> (facet, lookup, parser)
+RANGE_FILTERS = {
+    'price_min': ('price', 'price__gte', Decimal),
+    'price_max': ('price', 'price__lte', Decimal),
+    'height_min': ('mature_height', 'mature_height__gte', Decimal),
+    'height_max': ('mature_height', 'mature_height__lte', Decimal),
+    'temperature_low': ('temperature', 'temperature_min__lte', int),
+    'temperature_high': ('temperature', 'temperature_max__gte', int),
+}
+
+
+def get_list_param(query_params, name):
+    values = []
+    for value in query_params.getlist(name):
+        values.extend(v.strip() for v in value.split(',') if v.strip())
+    return values
+
+
+def parse_zone_and_month(query_params, errors):
+    """``?zone=`` and ``?month=`` as numbers (None when absent); adds to ``errors``"""
+    zone = month = None
+    if query_params.get('zone'):
+        try:
+            zone = parse_zone(query_params['zone'])
+        except ValueError:
+            errors['zone'] = f"Must be a hardiness zone from {MIN_ZONE} to {MAX_ZONE}"
+    if query_params.get('month'):
+        try:
+            month = parse_month(query_params['month'])
+        except ValueError:
+            errors['month'] = "Must be a month, as 1-12 or a name"
+    return zone, month
+
+
+def hardy_in(zone, prefix=''):
+    """Q for plants whose zone range includes ``zone``"""
+    return Q(**{f'{prefix}hardiness_zone_min__lte': zone, f'{prefix}hardiness_zone_max__gte': zone})
+
+
+def available_in(month):
+    """Condition for inventory available in ``month``, a bit test on available_months"""
+    bit = month_bit(month)
+    return Exact(F('available_months').bitand(bit), bit)
+
+
+class PlantFilterSet:
+    """Parses facet filters from query params and applies them to a queryset"""
+
+    def __init__(self, query_params):
+        # facet name -> Q, so a facet's own condition can be left out when
+        # counting it
+        self.conditions = {}
+        errors = {}
+
+        for field, choices in CHOICE_FILTERS.items():
+            values = get_list_param(query_params, field)
+            if not values:
+                continue
+            allowed = {choice for choice, _ in choices}
+            invalid = [value for value in values if value not in allowed]
+            if invalid:
+                errors[field] = f"Invalid choice(s): {', '.join(invalid)}"
+            else:
+                self.conditions[field] = Q(**{f'{field}__in': values})
+
+        for field in BOOLEAN_FILTERS:
+            value = query_params.get(field)
+            if value is None or value == '':
+                continue
+            if value.lower() not in ('true', 'false'):
+                errors[field] = "Must be 'true' or 'false'"
+            else:
+                self.conditions[field] = Q(**{field: value.lower() == 'true'})
+
+        for param, (facet, lookup, parse) in RANGE_FILTERS.items():
+            value = query_params.get(param)
+            if value is None or value == '':
+                continue
+            try:
+                condition = Q(**{lookup: parse(value)})
+            except (ValueError, InvalidOperation):
+                errors[param] = "Must be a number"
+                continue
+            if facet in self.conditions:
+                condition &= self.conditions[facet]
+            self.conditions[facet] = condition
+
+        zone, month = parse_zone_and_month(query_params, errors)
+        if zone is not None:
+            self.conditions['hardiness_zone'] = hardy_in(zone)
+        if month is not None:
+            stocked = PlantInventory.objects.filter(available_in(month)).values('plant_id')
+            self.conditions['month'] = Q(id__in=stocked)
+
+        if errors:
+            raise ValidationError(errors)
+
+    def filter(self, queryset):
+        if not self.conditions:
+            return queryset
+        return queryset.filter(*self.conditions.values())
+
+    def excluding(self, facet):
+        """Q for every active filter except ``facet``"""
+        condition = Q()
+        for name, q in self.conditions.items():
+            if name != facet:
+                condition &= q
+        return condition
+
+    def facet_counts(self, queryset):
+        """Count results per facet value in a single aggregate query"""
+        # Search may have added annotations and ordering; neither is needed
+        # to count, and dropping the ordering keeps the aggregate simple.
+        return self.summarize(queryset.order_by().aggregate(**self.facet_aggregates()))
+
+    async def afacet_counts(self, queryset):
+        return self.summarize(await queryset.order_by().aaggregate(**self.facet_aggregates()))
+
+    def facet_aggregates(self):
+        aggregates = {}
+        for field, choices in CHOICE_FILTERS.items():
+            others = self.excluding(field)
+            for value, _ in choices:
+                aggregates[f'{field}__{value}'] = Count(
+                    'id', filter=others & Q(**{field: value})
+                )
+        for field in BOOLEAN_FILTERS:
+            aggregates[f'{field}__true'] = Count(
+                'id', filter=self.excluding(field) & Q(**{field: True})
+            )
+        price_others = self.excluding('price')
+        aggregates['price__min'] = Min('price', filter=price_others)
+        aggregates['price__max'] = Max('price', filter=price_others)
+        aggregates['total'] = Count('id', filter=self.excluding(None))
+        return aggregates
+
+    def summarize(self, totals):
+        facets = {'total': totals['total']}
+        for field, choices in CHOICE_FILTERS.items():
+            facets[field] = {value: totals[f'{field}__{value}'] for value, _ in choices}
+        for field in BOOLEAN_FILTERS:
+            facets[field] = totals[f'{field}__true']
+        facets['price'] = {'min': totals['price__min'], 'max': totals['price__max']}
+        return facets
@@ -0,0 +1,91 @@
+"""Distance filtering without PostGIS.
+
+``?near=lat,lng&radius=km`` first narrows rows to a latitude/longitude
+bounding box, which the (latitude, longitude) index on NurseryProfile can
+answer, and only then evaluates the exact haversine distance on the rows
+left over. Both steps are plain SQL math, so they run on PostgreSQL and
+SQLite alike.
+"""
+import math
+
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+
+from .models import PlantInventory
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+
+
+def parse_near(query_params):
+    """Return (lat, lng, radius_km) from ``?near=`` and ``?radius=``, or None"""
+    near = query_params.get('near')
+    if not near:
+        return None
+    try:
+        lat, lng = (float(part) for part in near.split(','))
+    except ValueError:
+        raise ValidationError({'near': "Expected 'latitude,longitude'"})
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValidationError({'near': "Coordinates out of range"})
+    try:
+        radius = float(query_params.get('radius') or DEFAULT_RADIUS_KM)
+    except ValueError:
+        raise ValidationError({'radius': "Must be a number of kilometres"})
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValidationError({'radius': f"Must be between 0 and {MAX_RADIUS_KM} km"})
+    return lat, lng, radius
+
+
+def bounding_box_q(lat, lng, radius, prefix=''):
+    """Q matching a box that contains the circle of ``radius`` km"""
+    dlat = math.degrees(radius / EARTH_RADIUS_KM)
+    lat_min, lat_max = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    q = Q(**{f'{prefix}latitude__range': (lat_min, lat_max)})
+
+    # Longitude degrees shrink towards the poles; near them, or when the box
+    # spans the whole globe, only the latitude band is useful.
+    cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+    if cos_lat <= 0 or radius / (EARTH_RADIUS_KM * cos_lat) >= math.pi:
+        return q
+    dlng = math.degrees(radius / (EARTH_RADIUS_KM * cos_lat))
+    lng_min, lng_max = lng - dlng, lng + dlng
+    if lng_min < -180:
+        return q & (Q(**{f'{prefix}longitude__gte': lng_min + 360}) |
+                    Q(**{f'{prefix}longitude__lte': lng_max}))
+    if lng_max > 180:
+        return q & (Q(**{f'{prefix}longitude__gte': lng_min}) |
+                    Q(**{f'{prefix}longitude__lte': lng_max - 360}))
+    return q & Q(**{f'{prefix}longitude__range': (lng_min, lng_max)})
+
+
+def distance_expression(lat, lng, prefix=''):
+    """Haversine distance in km from (lat, lng) to each row's coordinates"""
+    lat_r = Value(math.radians(lat), output_field=FloatField())
+    lng_r = Value(math.radians(lng), output_field=FloatField())
+    row_lat = Radians(F(f'{prefix}latitude'))
+    row_lng = Radians(F(f'{prefix}longitude'))
+    a = (
+        Power(Sin((row_lat - lat_r) / 2), 2) +
+        Cos(lat_r) * Cos(row_lat) * Power(Sin((row_lng - lng_r) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(Sqrt(a))
+
+
+def filter_inventory_near(queryset, lat, lng, radius):
+    """Inventory at nurseries within ``radius`` km, nearest first"""
+    prefix = 'nursery__nursery_profile__'
+    return queryset.filter(bounding_box_q(lat, lng, radius, prefix)).annotate(
+        distance=distance_expression(lat, lng, prefix)
+    ).filter(distance__lte=radius).order_by('distance', 'id')
+
+
+def filter_plants_near(queryset, lat, lng, radius):
+    """Plants stocked by a nursery within ``radius`` km, nearest stock first"""
+    nearby = filter_inventory_near(PlantInventory.objects.all(), lat, lng, radius)
+    nearest = nearby.filter(plant_id=OuterRef('pk')).order_by('distance').values('distance')[:1]
+    return queryset.filter(id__in=nearby.order_by().values('plant_id')).annotate(
+        distance=Subquery(nearest, output_field=FloatField())
+    ).order_by('distance', 'common_name', 'id')
@@ -0,0 +1,370 @@
+import csv
+import io
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import bump_version_on_commit
+from .models import Plant
+from .search import update_search_index
+from .similarity import enqueue_similar_refresh
+from .serializers import PlantImportSerializer
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+# Uploads are validated in a process pool once they reach this many rows
+PARALLEL_MIN_ROWS = 10000
+
+IMPORT_MODES = ('create', 'upsert')
+# Fields that may be used, alone or together, as the natural key of a plant
+# when re-importing a catalog in upsert mode.
+NATURAL_KEY_FIELDS = ('scientific_name', 'common_name')
+DEFAULT_NATURAL_KEY = ('scientific_name',)
+
+BOOLEAN_COLUMNS = (
+    'drought_tolerant', 'deer_resistant', 'pest_resistant', 'edible',
+    'indoor_suitable',
+)
+
+# Columns understood by the importer and the value used when a column is
+# missing from the upload or left empty.
+CSV_DEFAULTS = {
+    'care_instructions': '',
+    'planting_instructions': '',
+    'light_requirement': 'medium',
+    'water_requirement': 'medium',
+    'temperature_min': 15,
+    'temperature_max': 30,
+    'humidity_requirement': 50,
+    'soil_type': '',
+    'fertilizer_requirements': '',
+    'mature_height': 30,
+    'mature_spread': 30,
+    'growth_rate': 'medium',
+    'time_to_maturity': '',
+    'hardiness_zone': '',
+    'native_region': '',
+    'price': 0,
+    'quantity': 0,
+}
+
+
+def is_blank(value):
+    # Only a missing value or an empty cell; 0 and False are real values
+    return value is None or value == ''
+
+
+def row_to_plant_data(row):
+    """Map a CSV row onto Plant field values, filling in defaults"""
+    plant_data = {
+        'common_name': row['common_name'],
+        'scientific_name': row['scientific_name'],
+        'description': row['description'],
+    }
+    for column, default in CSV_DEFAULTS.items():
+        value = row.get(column)
+        plant_data[column] = default if is_blank(value) else value
+    for column in BOOLEAN_COLUMNS:
+        value = row.get(column)
+        if is_blank(value):
+            value = False
+        elif isinstance(value, str):
+            value = value.lower() == 'true'
+        plant_data[column] = value
+    return plant_data
+
+
+def provided_columns(row):
+    """The Plant fields a row gives a value for, rather than leaving to defaults"""
+    return tuple(
+        column for column in ('common_name', 'scientific_name', 'description',
+                              *CSV_DEFAULTS, *BOOLEAN_COLUMNS)
+        if not is_blank(row.get(column))
+    )
+
+
+def parse_natural_key(value):
+    """Turn a comma separated list of field names into a natural key tuple"""
+    if not value:
+        return DEFAULT_NATURAL_KEY
+    key_fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    invalid = [field for field in key_fields if field not in NATURAL_KEY_FIELDS]
+    if invalid or not key_fields:
+        raise ValueError(
+            f"Invalid key {value!r}; choose from {', '.join(NATURAL_KEY_FIELDS)}"
+        )
+    return key_fields
+
+
+def iter_csv_rows(uploaded_file, encoding='utf-8-sig'):
+    """Yield (row_number, row) pairs, decoding the upload as it is read.
+
+    Row numbers are 1-based and count the header line, so they match what a
+    spreadsheet shows for the same row.
+    """
+    uploaded_file.seek(0)
+    raw = getattr(uploaded_file, 'file', uploaded_file)
+    stream = io.TextIOWrapper(raw, encoding=encoding, newline='')
+    try:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    finally:
+        # Leave the underlying file open; its owner closes it.
+        stream.detach()
+
+
+@cache
+def get_import_serializer():
+    return PlantImportSerializer()
+
+
+def validate_rows(chunk):
+    """Validate (row_number, row) pairs against PlantImportSerializer.
+
+    Returns a (validated data, provided_columns(row)) pair per valid row and
+    a (row_number, row, detail) triple per invalid one. Runs in validation worker processes
+    as well as in the importer's own.
+    """
+    serializer = get_import_serializer()
+    valid, errors = [], []
+    for row_number, row in chunk:
+        try:
+            valid.append((serializer.run_validation(row_to_plant_data(row)), provided_columns(row)))
+        except serializers.ValidationError as exc:
+            errors.append((row_number, row, exc.detail))
+        except (KeyError, ValueError) as exc:
+            errors.append((row_number, row, f"Error processing row: {exc}"))
+    return valid, errors
+
+
+def validation_pool(processes):
+    # Workers start from a fresh interpreter rather than a fork of this one,
+    # so they share no database connections or locks with it. Django is set
+    # up before anything from this module (and so the models) is imported.
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+class PlantCSVImporter:
+    """Validate and insert plants from a CSV upload in fixed-size chunks.
+
+    Rows are never all held in memory: each chunk is validated, written with
+    ``bulk_create`` and discarded.
+
+    In ``upsert`` mode rows are matched against existing plants on
+    ``key_fields``: each chunk looks up its keys in one query, changed plants
+    go through ``bulk_update``, new ones through ``bulk_create`` and rows
+    identical to what is stored are skipped. When a key appears more than
+    once in a chunk the last row wins. Existing plants only take the columns
+    a row has a value for; missing columns and empty cells leave what is
+    stored alone, and only new plants get the defaults for them.
+
+    With ``atomic=True`` the whole import runs in one transaction and is
+    rolled back if any row fails validation, so an upload either lands
+    completely or not at all. With ``atomic=False`` every chunk commits on
+    its own and invalid rows are skipped and reported; this is what
+    background jobs use so that their progress is visible while they run.
+    ``on_chunk`` is called with the running result after each chunk.
+
+    Validation is CPU bound, so once an upload reaches
+    ``parallel_min_rows`` rows its chunks are validated ahead of the
+    writes, several at a time, in a pool of ``processes`` worker processes
+    (PLANTS_IMPORT_VALIDATION_PROCESSES by default). Chunks are still
+    written, and errors reported, in file order.
+    """
+
+    def __init__(self, user=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_reported_errors=MAX_REPORTED_ERRORS, atomic=True,
+                 on_chunk=None, mode='create', key_fields=DEFAULT_NATURAL_KEY,
+                 processes=None, parallel_min_rows=PARALLEL_MIN_ROWS):
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"Unknown import mode {mode!r}")
+        self.user = user
+        self.mode = mode
+        self.key_fields = tuple(key_fields)
+        self.chunk_size = chunk_size
+        self.max_reported_errors = max_reported_errors
+        self.atomic = atomic
+        self.on_chunk = on_chunk
+        if processes is None:
+            processes = getattr(settings, 'PLANTS_IMPORT_VALIDATION_PROCESSES', 1)
+        self.processes = processes
+        self.parallel_min_rows = parallel_min_rows
+
+    def run(self, uploaded_file):
+        return self.run_rows(iter_csv_rows(uploaded_file))
+
+    def run_rows(self, rows):
+        """Import an iterable of (row_number, row dict) pairs"""
+        result = {
+            'rows': 0,
+            'count': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'error_count': 0,
+            'errors': [],
+            'chunks': [],
+        }
+        if not self.atomic:
+            self.import_rows(rows, result)
+            return result
+
+        with transaction.atomic():
+            self.import_rows(rows, result)
+            if result['error_count']:
+                transaction.set_rollback(True)
+                result['count'] = result['updated'] = result['unchanged'] = 0
+        return result
+
+    def import_rows(self, rows, result):
+        decode_error = []
+        for chunk, (valid, errors) in self.validate_chunks(self.read_chunks(rows, decode_error)):
+            self.process_chunk(chunk, valid, errors, result)
+        if decode_error:
+            self.add_error(result, None, {}, "File is not valid UTF-8")
+
+    def read_chunks(self, rows, decode_error):
+        """Yield lists of ``chunk_size`` rows; stops at undecodable input"""
+        chunk = []
+        try:
+            for row_number, row in rows:
+                chunk.append((row_number, row))
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+        except UnicodeDecodeError:
+            decode_error.append(True)
+        if chunk:
+            yield chunk
+
+    def validate_chunks(self, chunks):
+        """Yield (chunk, validate_rows(chunk)) in order, in parallel for large uploads"""
+        pool = None
+        pending = deque()
+        rows = 0
+        try:
+            for chunk in chunks:
+                rows += len(chunk)
+                if pool is None:
+                    if self.processes < 2 or rows < self.parallel_min_rows:
+                        yield chunk, validate_rows(chunk)
+                        continue
+                    pool = validation_pool(self.processes)
+                pending.append((chunk, pool.submit(validate_rows, chunk)))
+                # Keep every worker busy without reading the whole file ahead
+                if len(pending) >= 2 * self.processes:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def process_chunk(self, chunk, valid, errors, result):
+        for row_number, row, detail in errors:
+            self.add_error(result, row_number, row, detail)
+
+        created = updated = unchanged = 0
+        # Once a row has failed an atomic import will be rolled back, so there
+        # is no point writing further chunks; keep validating to report errors.
+        if valid and not (self.atomic and result['error_count']):
+            if self.mode == 'upsert':
+                created, updated, unchanged = self.upsert(valid)
+            else:
+                created = len(self.write([data for data, _ in valid]))
+
+        result['rows'] += len(chunk)
+        result['count'] += created
+        result['updated'] += updated
+        result['unchanged'] += unchanged
+        result['chunks'].append({
+            'chunk': len(result['chunks']) + 1,
+            'first_row': chunk[0][0],
+            'last_row': chunk[-1][0],
+            'rows': len(chunk),
+            'created': created,
+            'updated': updated,
+            'unchanged': unchanged,
+            'errors': len(errors),
+        })
+        if self.on_chunk:
+            self.on_chunk(result)
+
+    def write(self, validated_rows):
+        plants = [Plant(**data, created_by=self.user) for data in validated_rows]
+        for plant in plants:
+            plant.fill_hardiness_zone()
+        plants = Plant.objects.bulk_create(plants, batch_size=self.chunk_size)
+        # bulk_create sends no post_save, so refresh derived data here
+        update_search_index(plant.pk for plant in plants)
+        enqueue_similar_refresh(plant.pk for plant in plants)
+        bump_version_on_commit(Plant)
+        return plants
+
+    def upsert(self, validated_rows):
+        """Write a chunk in upsert mode, returning (created, updated, unchanged)"""
+        by_key = {}
+        for data, provided in validated_rows:
+            by_key[tuple(data[field] for field in self.key_fields)] = data, provided
+
+        fields = list(validated_rows[0][0])
+        lookup = {f'{self.key_fields[0]}__in': [key[0] for key in by_key]}
+        existing = {}
+        for plant in Plant.objects.filter(**lookup).only('id', *fields):
+            key = tuple(getattr(plant, field) for field in self.key_fields)
+            if key in by_key:
+                existing.setdefault(key, []).append(plant)
+
+        now = timezone.now()
+        new_rows, changed, changed_fields, unchanged = [], [], set(), 0
+        for key, (data, provided) in by_key.items():
+            plants = existing.get(key)
+            if not plants:
+                new_rows.append(data)
+                continue
+            updates = {field: data[field] for field in provided}
+            for plant in plants:
+                differing = [field for field, value in updates.items() if getattr(plant, field) != value]
+                if not differing:
+                    unchanged += 1
+                    continue
+                for field in differing:
+                    setattr(plant, field, updates[field])
+                changed_fields.update(differing)
+                plant.fill_hardiness_zone()
+                plant.updated_at = now
+                changed.append(plant)
+
+        if changed:
+            Plant.objects.bulk_update(
+                changed, sorted(changed_fields) + ['hardiness_zone_min', 'hardiness_zone_max', 'updated_at'],
+                batch_size=self.chunk_size,
+            )
+            # bulk_update sends no post_save, so refresh derived data here
+            update_search_index(plant.pk for plant in changed)
+            enqueue_similar_refresh(plant.pk for plant in changed)
+            bump_version_on_commit(Plant)
+        created = len(self.write(new_rows)) if new_rows else 0
+        return created, len(changed), unchanged
+
+    def add_error(self, result, row_number, row, detail):
+        result['error_count'] += 1
+        if len(result['errors']) < self.max_reported_errors:
+            result['errors'].append({
+                'row': row_number,
+                'common_name': row.get('common_name'),
+                'error': detail,
+            })
@@ -0,0 +1,254 @@
+"""Per-route cost metrics for the API, in Prometheus text format.
+
+With ``PLANTS_INSTRUMENTATION`` on, InstrumentationMiddleware records for
+every request, labelled by route pattern, viewset action and method:
+
+* wall time (as a histogram)
+* number of DB queries and time spent in them, via an execute wrapper
+  on every database connection
+* time spent in the serializers that use SerializerTimingMixin
+* response bytes
+
+Requests over ``PLANTS_QUERY_BUDGET`` queries or
+``PLANTS_LATENCY_BUDGET_MS`` are logged as warnings and counted. Totals
+are kept per process and served at ``/metrics`` to the addresses in
+``PLANTS_METRICS_ALLOWED_IPS``. Each response also gets a
+``Server-Timing`` header so the numbers show up in browser dev tools.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# Stats of the request being handled, if it is instrumented. sync_to_async
+# runs its function in a copy of the caller's context, so queries an async
+# view makes through the ORM's worker threads see the same stats.
+current_stats = ContextVar('plants_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Called for each query through count_query
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+def count_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection, in whichever thread"""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class SerializerTimingMixin:
+    """Adds a serializer's rendering time to the current request's stats.
+
+    Nested serializers are only counted once, as part of their parent.
+    """
+
+    def to_representation(self, instance):
+        stats = current_stats.get()
+        if stats is None or stats.serializer_depth:
+            return super().to_representation(instance)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_time += time.perf_counter() - started
+            stats.serializer_depth -= 1
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Thread-safe per-process totals, keyed by (route, action, method)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.totals = defaultdict(float)
+
+    def record(self, labels, status, duration, stats, response_bytes, over_budget):
+        with self.lock:
+            self.latency[labels].observe(duration)
+            self.queries[labels].observe(stats.queries)
+            self.totals[('db_seconds', labels)] += stats.db_time
+            self.totals[('serializer_seconds', labels)] += stats.serializer_time
+            self.totals[('response_bytes', labels)] += response_bytes
+            self.totals[('responses', labels + (('status', str(status)),))] += 1
+            for budget in over_budget:
+                self.totals[('over_budget', labels + (('budget', budget),))] += 1
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            self.render_histograms(lines, 'plants_request_duration_seconds',
+                                   'Request wall time', self.latency)
+            self.render_histograms(lines, 'plants_request_db_queries',
+                                   'Database queries per request', self.queries)
+            for name, kind, help_text in (
+                ('db_seconds', 'plants_db_duration_seconds_total', 'Time spent in database queries'),
+                ('serializer_seconds', 'plants_serializer_duration_seconds_total',
+                 'Time spent in serializers'),
+                ('response_bytes', 'plants_response_bytes_total', 'Response body bytes'),
+                ('responses', 'plants_responses_total', 'Responses by status code'),
+                ('over_budget', 'plants_over_budget_total',
+                 'Requests over the query or latency budget'),
+            ):
+                lines.append(f'# HELP {kind} {help_text}')
+                lines.append(f'# TYPE {kind} counter')
+                for (total_name, labels), value in sorted(self.totals.items()):
+                    if total_name == name:
+                        lines.append(f'{kind}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def render_histograms(lines, name, help_text, histograms):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, histogram in sorted(histograms.items()):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {count}')
+            lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {histogram.total}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(histogram.sum)}')
+            lines.append(f'{name}_count{format_labels(labels)} {histogram.total}')
+
+
+def format_labels(labels):
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    # So that async views served over ASGI stay async when instrumented
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PLANTS_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections are per thread, and under ASGI the ORM queries from
+        # worker threads rather than the one running the middleware, so
+        # count on every connection instead of wrapping this thread's ones
+        connection_created.connect(install_query_counter, dispatch_uid='plants.instrumentation')
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    def record(self, request, response, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        action = getattr(match.func, 'actions', {}).get(request.method.lower(), '') if match else ''
+        labels = (('route', route), ('action', action), ('method', request.method))
+        response_bytes = 0 if response.streaming else len(response.content)
+
+        over_budget = []
+        if stats.queries > getattr(settings, 'PLANTS_QUERY_BUDGET', 20):
+            over_budget.append('queries')
+        if duration * 1000 > getattr(settings, 'PLANTS_LATENCY_BUDGET_MS', 500):
+            over_budget.append('latency')
+        if over_budget:
+            logger.warning(
+                "%s %s (%s) over budget: %d queries, %.1f ms total, %.1f ms in DB, %.1f ms serializing",
+                request.method, request.path, action or route, stats.queries,
+                duration * 1000, stats.db_time * 1000, stats.serializer_time * 1000,
+            )
+
+        registry.record(labels, response.status_code, duration, stats, response_bytes, over_budget)
+        response['Server-Timing'] = ', '.join([
+            f'db;desc="{stats.queries} queries";dur={stats.db_time * 1000:.1f}',
+            f'serializer;dur={stats.serializer_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ])
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, only for PLANTS_METRICS_ALLOWED_IPS"""
+    allowed = getattr(settings, 'PLANTS_METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if not getattr(settings, 'PLANTS_INSTRUMENTATION', False) or request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
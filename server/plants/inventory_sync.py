@@ -0,0 +1,199 @@
+"""Bulk stock and price sync for one nursery's inventory.
+
+A nursery's point-of-sale system sends its stock list in one request, as
+JSON or CSV, with rows keyed by ``(plant_id, size)``. All the nursery's rows
+for those plants are fetched in one query. Changed rows are then written
+with ``bulk_update`` and new ones with ``bulk_create``, all in a single
+transaction, so a sync of thousands of rows costs a handful of statements
+rather than a PATCH per row.
+
+Quantities a nursery sends are its stock on hand, which still includes the
+units held by reservations; those were already taken out of the stored
+``quantity`` (see ``plants.reservations``) and come back to it when they are
+released, so the stored quantity is the sent one less the units held.
+"""
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import serializers
+
+from .availability import refresh_availability
+from .cache import bump_version_on_commit
+from .importers import MAX_REPORTED_ERRORS, iter_csv_rows
+from .models import Plant, PlantInventory, StockReservation
+from .serializers import InventorySyncRowSerializer
+
+MAX_SYNC_ROWS = 10000
+SYNC_FIELDS = ('quantity', 'price', 'notes', 'seasonal_availability')
+# Fields a row must carry when it creates a new inventory row
+REQUIRED_FOR_CREATE = ('quantity', 'price')
+
+
+class InventorySync:
+    """Create or update a nursery's inventory rows from a stock list.
+
+    Rows are validated first; if any fails, nothing is written and the errors
+    are returned. Otherwise the result lists a diff per created or updated
+    row. When a key appears more than once the last row wins.
+    """
+
+    def __init__(self, nursery, batch_size=1000, max_rows=MAX_SYNC_ROWS,
+                 max_reported_errors=MAX_REPORTED_ERRORS):
+        self.nursery = nursery
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.max_reported_errors = max_reported_errors
+        self.serializer = InventorySyncRowSerializer()
+
+    def run(self, uploaded_file):
+        """Sync from a CSV upload; empty cells leave a field unchanged"""
+        rows = (
+            (row_number, {column: value for column, value in row.items() if value not in ('', None)})
+            for row_number, row in iter_csv_rows(uploaded_file)
+        )
+        return self.run_rows(rows)
+
+    def run_rows(self, rows):
+        """Sync an iterable of (row_number, row dict) pairs"""
+        result = {
+            'rows': 0,
+            'created': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'error_count': 0,
+            'errors': [],
+            'changes': [],
+        }
+        by_key = {}
+        try:
+            for row_number, row in rows:
+                result['rows'] += 1
+                if result['rows'] > self.max_rows:
+                    self.add_error(result, None, {}, f"At most {self.max_rows} rows per sync")
+                    break
+                try:
+                    data = self.serializer.run_validation(row)
+                except serializers.ValidationError as exc:
+                    self.add_error(result, row_number, row, exc.detail)
+                    continue
+                by_key[(data['plant_id'], data['size'])] = (row_number, data)
+        except UnicodeDecodeError:
+            self.add_error(result, None, {}, "File is not valid UTF-8")
+
+        if by_key and not result['error_count']:
+            with transaction.atomic():
+                self.apply(by_key, result)
+                if result['error_count']:
+                    transaction.set_rollback(True)
+        if result['error_count']:
+            result['created'] = result['updated'] = result['unchanged'] = 0
+            result['changes'] = []
+        return result
+
+    def apply(self, by_key, result):
+        plant_ids = {plant_id for plant_id, _ in by_key}
+        known_plants = set(Plant.objects.filter(pk__in=plant_ids).values_list('id', flat=True))
+        # Locked in id order, like reservations.adjust_stock, so no
+        # reservation changes them between reading the holds and writing
+        existing = {
+            (item.plant_id, item.size): item
+            for item in PlantInventory.objects.filter(
+                nursery=self.nursery, plant_id__in=plant_ids
+            ).select_for_update().order_by('pk').only('id', 'plant_id', 'size', *SYNC_FIELDS)
+        }
+        held = dict(
+            StockReservation.objects.filter(
+                inventory__in=[item.pk for item in existing.values()], status='held'
+            ).values('inventory').annotate(total=Sum('quantity')).values_list('inventory', 'total')
+        )
+
+        now = timezone.now()
+        new_items, changed = [], []
+        for key, (row_number, data) in by_key.items():
+            plant_id, size = key
+            item = existing.get(key)
+            if item is None:
+                if plant_id not in known_plants:
+                    self.add_error(result, row_number, data, f"Unknown plant {plant_id}")
+                    continue
+                missing = [field for field in REQUIRED_FOR_CREATE if field not in data]
+                if missing:
+                    self.add_error(result, row_number, data,
+                                   f"New inventory needs {', '.join(missing)}")
+                    continue
+                item = PlantInventory(
+                    nursery=self.nursery, plant_id=plant_id, size=size,
+                    created_at=now, updated_at=now,
+                    **{field: data[field] for field in SYNC_FIELDS if field in data}
+                )
+                item.fill_available_months()
+                new_items.append(item)
+                continue
+
+            item_held = held.get(item.pk, 0)
+            if 'quantity' in data and data['quantity'] < item_held:
+                self.add_error(result, row_number, data,
+                               f"Quantity is below the {item_held} units held by reservations")
+                continue
+            # Diffs compare stock on hand, held units included
+            item.quantity += item_held
+            diff = {
+                field: [getattr(item, field), data[field]]
+                for field in SYNC_FIELDS
+                if field in data and getattr(item, field) != data[field]
+            }
+            if not diff:
+                result['unchanged'] += 1
+                continue
+            for field, (_, value) in diff.items():
+                setattr(item, field, value)
+            item.quantity -= item_held
+            item.fill_available_months()
+            item.updated_at = now
+            changed.append(item)
+            result['changes'].append({
+                'id': item.pk, 'plant_id': plant_id, 'size': size,
+                'action': 'updated', 'changes': diff,
+            })
+
+        if result['error_count']:
+            return
+        if changed:
+            PlantInventory.objects.bulk_update(
+                changed, list(SYNC_FIELDS) + ['available_months', 'updated_at'],
+                batch_size=self.batch_size
+            )
+        if new_items:
+            # A concurrent sync may have created the same rows since they
+            # were read; the later write wins, as it would for an update
+            PlantInventory.objects.bulk_create(
+                new_items,
+                update_conflicts=True,
+                unique_fields=['plant', 'nursery', 'size'],
+                update_fields=list(SYNC_FIELDS) + ['available_months', 'updated_at'],
+                batch_size=self.batch_size,
+            )
+            result['changes'].extend(
+                {'id': item.pk, 'plant_id': item.plant_id, 'size': item.size, 'action': 'created'}
+                for item in new_items
+            )
+        result['created'] = len(new_items)
+        result['updated'] = len(changed)
+
+        if changed or new_items:
+            # Bulk writes send no post_save, so refresh derived data here
+            refresh_availability({item.plant_id for item in changed + new_items})
+            bump_version_on_commit(PlantInventory)
+
+    def add_error(self, result, row_number, row, detail):
+        result['error_count'] += 1
+        if not isinstance(row, dict):
+            # A JSON list item that isn't an object
+            row = {}
+        if len(result['errors']) < self.max_reported_errors:
+            result['errors'].append({
+                'row': row_number,
+                'plant_id': row.get('plant_id'),
+                'size': row.get('size'),
+                'error': detail,
+            })
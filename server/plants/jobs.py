@@ -0,0 +1,117 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .executors import get_executor
+from .importers import PlantCSVImporter, parse_natural_key
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_import_job(job):
+    """Schedule a job to run once the transaction that created it commits"""
+    transaction.on_commit(lambda: get_executor().submit(run_import_job, job.pk))
+
+
+def run_import_job(job_id):
+    """Run an import job to completion, recording progress after each chunk"""
+    close_old_connections()
+    job = None
+    try:
+        now = timezone.now()
+        # Claiming the job makes running it twice (see recover_import_jobs) a no-op
+        if not ImportJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=now, updated_at=now
+        ):
+            return
+        job = ImportJob.objects.get(pk=job_id)
+
+        def record_progress(result):
+            ImportJob.objects.filter(pk=job_id).update(
+                rows_processed=result['rows'],
+                rows_created=result['count'],
+                rows_updated=result['updated'],
+                rows_unchanged=result['unchanged'],
+                error_count=result['error_count'],
+                errors=result['errors'],
+                chunks_done=len(result['chunks']),
+                updated_at=timezone.now(),
+            )
+
+        importer = PlantCSVImporter(
+            user=job.created_by,
+            atomic=False,
+            on_chunk=record_progress,
+            mode=job.mode,
+            key_fields=parse_natural_key(job.key),
+        )
+        with job.file.open('rb'):
+            result = importer.run(job.file)
+
+        record_progress(result)
+        ImportJob.objects.filter(pk=job_id).update(
+            status='succeeded',
+            message=(
+                f"Imported {result['count']} plants, updated {result['updated']}, "
+                f"{result['unchanged']} unchanged"
+            ),
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.exception("Import job %s failed", job_id)
+        ImportJob.objects.filter(pk=job_id).update(
+            status='failed',
+            message=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+    finally:
+        if job is not None:
+            discard_upload(job)
+        close_old_connections()
+
+
+def discard_upload(job):
+    """Delete a finished job's uploaded file"""
+    if job.file:
+        try:
+            job.file.delete(save=False)
+        except OSError:
+            logger.exception("Deleting the upload of import job %s failed", job.pk)
+        ImportJob.objects.filter(pk=job.pk).update(file='')
+
+
+def recover_import_jobs():
+    """Settle jobs left behind by a worker process that stopped.
+
+    Jobs only run on their worker's thread pool, so they die with it. A
+    running job records progress after every chunk; one that hasn't for
+    PLANTS_IMPORT_STALE_SECONDS is marked failed, keeping the chunks it
+    committed. Stale pending jobs are queued again here. Returns the
+    numbers of jobs failed and re-queued.
+    """
+    now = timezone.now()
+    stale = ImportJob.objects.filter(
+        updated_at__lt=now - timedelta(seconds=getattr(settings, 'PLANTS_IMPORT_STALE_SECONDS', 600))
+    )
+    failed = 0
+    for job in stale.filter(status='running'):
+        if ImportJob.objects.filter(pk=job.pk, status='running', updated_at=job.updated_at).update(
+            status='failed',
+            message="Interrupted: the worker running this import stopped",
+            finished_at=now,
+            updated_at=now,
+        ):
+            discard_upload(job)
+            failed += 1
+    pending = list(stale.filter(status='pending').values_list('pk', flat=True))
+    for job_id in pending:
+        get_executor().submit(run_import_job, job_id)
+    if failed or pending:
+        logger.warning("Recovered import jobs: %d failed, %d re-queued", failed, len(pending))
+    return failed, len(pending)
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from plants.models import Plant, PlantImage
+from plants.renditions import IMAGE_FIELDS, needs_renditions, update_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate resized renditions for plant images that are missing or out of date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate renditions that already look current')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        pending = []
+        for model in (Plant, PlantImage):
+            image_field, renditions_field = IMAGE_FIELDS[model]
+            rows = model.objects.exclude(**{image_field: ''}).only('id', image_field, renditions_field)
+            for instance in rows.iterator(chunk_size=1000):
+                if options['force'] or needs_renditions(instance):
+                    pending.append((model, instance.pk))
+
+        def render(job):
+            model, pk = job
+            try:
+                update_renditions(model, pk, reuse=not options['force'])
+                return None
+            except Exception as e:
+                return f'{model.__name__} {pk}: {e}'
+            finally:
+                close_old_connections()
+
+        # Pillow releases the GIL while resizing and encoding, so threads help
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            failures = [failure for failure in pool.map(render, pending) if failure]
+
+        for failure in failures:
+            self.stderr.write(failure)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {len(pending) - len(failures)} of {len(pending)} images'
+        ))
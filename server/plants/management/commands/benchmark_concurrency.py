@@ -0,0 +1,113 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from plants.management.commands.benchmark_plants import percentile
+from plants.models import Plant
+
+
+class Command(BaseCommand):
+    help = ('Load a running server with many concurrent clients and compare each '
+            'catalog endpoint under /api/ with its async twin under /api/async/. '
+            'Start the server separately, e.g. under an ASGI server with '
+            'nursery_backend.asgi:application, and point --url at it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', default='100,250,500,1000',
+                            help='Comma separated numbers of concurrent clients')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per run')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request fails')
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('--url must be a plain http:// URL')
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma separated list of numbers')
+        plant = Plant.objects.order_by('id').values_list('id', flat=True).first()
+        if plant is None:
+            raise CommandError('No plants to benchmark; run generate_catalog first')
+
+        endpoints = {
+            'plant_list': 'plants/',
+            'plant_search': 'plants/?search=rose',
+            'plant_retrieve': f'plants/{plant}/',
+            'inventory_list': 'inventory/',
+        }
+        host, port = url.hostname, url.port or 80
+        results = []
+        for name, path in endpoints.items():
+            for level in levels:
+                for mode, prefix in (('sync', '/api/'), ('async', '/api/async/')):
+                    run = asyncio.run(self.load(host, port, prefix + path, level, options))
+                    run.update(endpoint=name, mode=mode, concurrency=level)
+                    results.append(run)
+                    self.stdout.write(
+                        f"{name:<16} {mode:<6} {level:>5} clients  {run['requests_per_second']:8.1f} req/s  "
+                        f"p50 {run['p50_ms'] or 0:8.1f} ms  p99 {run['p99_ms'] or 0:8.1f} ms  {run['errors']} errors"
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'meta': {
+                        'timestamp': timezone.now().isoformat(),
+                        'url': options['url'],
+                        'duration': options['duration'],
+                    },
+                    'runs': results,
+                }, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    async def load(self, host, port, path, clients, options):
+        """Have ``clients`` clients request ``path`` back to back for the duration"""
+        request = f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode()
+        deadline = time.perf_counter() + options['duration']
+        timings, errors = [], 0
+
+        async def fetch():
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await reader.read()
+            finally:
+                writer.close()
+            return response.split(b' ', 2)[1] == b'200'
+
+        async def client():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = await asyncio.wait_for(fetch(), options['timeout'])
+                except (OSError, IndexError, asyncio.TimeoutError):
+                    ok = False
+                if ok:
+                    timings.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'errors': errors,
+            'requests_per_second': round(len(timings) / elapsed, 1),
+            'mean_ms': round(statistics.fmean(timings), 3) if timings else None,
+            'p50_ms': round(percentile(timings, 50), 3) if timings else None,
+            'p95_ms': round(percentile(timings, 95), 3) if timings else None,
+            'p99_ms': round(percentile(timings, 99), 3) if timings else None,
+        }
@@ -0,0 +1,95 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from plants.geo import distance_expression, filter_inventory_near
+from plants.models import NurseryProfile, Plant, PlantInventory
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Time ?near= lookups against generated nurseries, comparing the '
+            'bounding-box prefilter with a full haversine scan. All generated '
+            'rows are rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nurseries', type=int, default=10000)
+        parser.add_argument('--stock', type=int, default=5, help='Inventory rows per nursery')
+        parser.add_argument('--radius', type=float, default=20)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        plants = list(Plant.objects.values_list('id', flat=True)[:200])
+        if not plants:
+            raise CommandError('No plants to stock; run seed_plants first')
+
+        # Nurseries spread over Great Britain, roughly
+        User = get_user_model()
+        User.objects.bulk_create(
+            (User(username=f'benchmark-nursery-{i}') for i in range(options['nurseries'])),
+            batch_size=1000,
+        )
+        users = User.objects.filter(username__startswith='benchmark-nursery-')
+        profiles = [
+            NurseryProfile(nursery=user, name=user.username,
+                           latitude=rng.uniform(50.0, 58.5), longitude=rng.uniform(-5.5, 1.7))
+            for user in users
+        ]
+        NurseryProfile.objects.bulk_create(profiles, batch_size=1000)
+        PlantInventory.objects.bulk_create(
+            (
+                PlantInventory(nursery=profile.nursery, plant_id=rng.choice(plants),
+                               size=f'{size + 1} litre', quantity=rng.randint(0, 50),
+                               price=rng.randint(1, 80))
+                for profile in profiles for size in range(options['stock'])
+            ),
+            batch_size=1000,
+        )
+
+        radius = options['radius']
+        points = [(rng.uniform(50.5, 58.0), rng.uniform(-5.0, 1.2)) for _ in range(options['queries'])]
+
+        def prefiltered(lat, lng):
+            return list(filter_inventory_near(PlantInventory.objects.all(), lat, lng, radius)
+                        .values_list('id', flat=True))
+
+        def full_scan(lat, lng):
+            prefix = 'nursery__nursery_profile__'
+            return list(
+                PlantInventory.objects.annotate(distance=distance_expression(lat, lng, prefix))
+                .filter(distance__lte=radius).order_by('distance', 'id')
+                .values_list('id', flat=True)
+            )
+
+        for label, lookup in (('bounding box + haversine', prefiltered),
+                              ('haversine full scan', full_scan)):
+            rows = 0
+            started = time.perf_counter()
+            for lat, lng in points:
+                rows += len(lookup(lat, lng))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:<26} {elapsed * 1000 / len(points):8.2f} ms/query '
+                f'({rows / len(points):.1f} rows on average)'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["nurseries"]} nurseries, {options["nurseries"] * options["stock"]} '
+            f'inventory rows, {radius} km radius; generated rows rolled back'
+        ))
@@ -0,0 +1,281 @@
+import csv
+import io
+import json
+import platform
+import random
+import statistics
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from plants.importers import BOOLEAN_COLUMNS, CSV_DEFAULTS, PlantCSVImporter
+from plants.inventory_sync import InventorySync
+from plants.models import NurseryProfile, Plant, PlantInventory
+from plants.synthetic import SIZES, synthetic_plant_rows
+from plants.views import PlantInventoryViewSet, PlantViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Measure API latency and import/sync throughput against the configured '
+            'database and write the results as JSON. With --baseline, fail if any '
+            'measurement regressed past --tolerance. Run generate_catalog first '
+            'for realistic table sizes; writes made by the throughput runs are '
+            'rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--import-rows', type=int, default=2000)
+        parser.add_argument('--sync-rows', type=int, default=2000)
+        parser.add_argument('--page-sizes', default='20,200,2000',
+                            help='Rows per page for the list rendering comparison')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown against the baseline, as a fraction')
+
+    def handle(self, *args, **options):
+        if not Plant.objects.exists():
+            raise CommandError('No plants to benchmark; run generate_catalog first')
+        rng = random.Random(options['seed'])
+
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'database_version': '.'.join(str(part) for part in connection.Database.version_info)
+                if hasattr(connection.Database, 'version_info') else '',
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'plants': Plant.objects.count(),
+                'nurseries': NurseryProfile.objects.count(),
+                'inventory': PlantInventory.objects.count(),
+                'iterations': options['iterations'],
+            },
+            'latency': {},
+            'throughput': {},
+        }
+
+        # The response cache would turn every repeat into a cache hit
+        with override_settings(PLANTS_CACHE_TIMEOUT=0, PLANTS_INSTRUMENTATION=False,
+                               ALLOWED_HOSTS=['testserver']):
+            client = Client()
+            for name, urls in self.scenarios(rng, options['iterations']):
+                results['latency'][name] = self.time_requests(client, urls, options['warmup'])
+                self.report_latency(name, results['latency'][name])
+
+            # Regular serializers against plants.fast_lists, per page size
+            for size in (int(size) for size in options['page_sizes'].split(',')):
+                for label, viewset in (('plant', PlantViewSet), ('inventory', PlantInventoryViewSet)):
+                    for name, measurement in self.time_rendering(viewset, size, options).items():
+                        results['latency'][f'{label}_list_{name}_{size}'] = measurement
+                        self.report_latency(f'{label}_list_{name}_{size}', measurement)
+
+        results['throughput']['csv_import'] = self.time_import(options['import_rows'], rng)
+        results['throughput']['inventory_sync'] = self.time_sync(options['sync_rows'], rng)
+        for name, measurement in results['throughput'].items():
+            self.stdout.write(
+                f"{name:<22} {measurement['rows_per_second']:10.0f} rows/s "
+                f"({measurement['rows']} rows, {measurement['queries']} queries)"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare(baseline, results, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(regression)
+                raise CommandError(f'{len(regressions)} measurements regressed against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def scenarios(self, rng, iterations):
+        """(name, urls) pairs; each URL is requested once"""
+        plant_ids = list(Plant.objects.values_list('id', flat=True)[:1000])
+        names = list(Plant.objects.values_list('common_name', flat=True)[:200])
+        words = [word for name in names for word in name.split() if len(word) > 3 and not word.isdigit()]
+        nurseries = list(NurseryProfile.objects.values_list('latitude', 'longitude')[:200])
+
+        def repeat(make_url):
+            return [make_url() for _ in range(iterations)]
+
+        yield 'plant_list', repeat(lambda: '/api/plants/')
+        yield 'plant_list_filtered', repeat(lambda: (
+            f"/api/plants/?light_requirement={rng.choice(('low', 'medium', 'high'))}"
+            f"&drought_tolerant=true&price_max={rng.randint(20, 100)}"
+        ))
+        if words:
+            yield 'plant_search', repeat(lambda: f'/api/plants/?search={rng.choice(words)}')
+        yield 'plant_retrieve', repeat(lambda: f'/api/plants/{rng.choice(plant_ids)}/')
+        yield 'inventory_list', repeat(lambda: '/api/inventory/')
+        if nurseries:
+            def near():
+                lat, lng = rng.choice(nurseries)
+                return f'/api/inventory/?near={lat:.4f},{lng:.4f}&radius=25'
+            yield 'inventory_near', repeat(near)
+
+    def time_requests(self, client, urls, warmup):
+        for url in urls[:warmup]:
+            client.get(url)
+        timings, queries = [], []
+        for url in urls:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} returned {response.status_code}')
+            queries.append(len(captured))
+        return summarize(timings, queries)
+
+    def time_rendering(self, viewset, size, options):
+        """Time list pages of ``size`` rows, rendered to bytes, both ways"""
+        pagination = type('Pagination', (viewset.pagination_class,), {'max_page_size': size})
+        view = type(viewset.__name__, (viewset,), {'pagination_class': pagination}).as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        measurements, bodies = {}, {}
+        for name, fast in (('serializer', False), ('fast', True)):
+            timings, queries = [], []
+            with override_settings(PLANTS_FAST_LISTS=fast):
+                for i in range(options['warmup'] + options['iterations']):
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        response = view(factory.get('/', {'page_size': size, 'format': 'json'}))
+                        response.render()
+                        elapsed = (time.perf_counter() - started) * 1000
+                    if i >= options['warmup']:
+                        timings.append(elapsed)
+                        queries.append(len(captured))
+            bodies[name] = response.content
+            measurements[name] = summarize(timings, queries)
+        if bodies['serializer'] != bodies['fast']:
+            raise CommandError(f'{viewset.__name__} fast list output differs at {size} rows')
+        return measurements
+
+    def report_latency(self, name, measurement):
+        self.stdout.write(
+            f"{name:<22} p50 {measurement['p50_ms']:8.2f} ms  p95 {measurement['p95_ms']:8.2f} ms  "
+            f"{measurement['queries']} queries"
+        )
+
+    def time_import(self, rows, rng):
+        columns = ['common_name', 'scientific_name', 'description',
+                   *CSV_DEFAULTS, *BOOLEAN_COLUMNS]
+        text = io.StringIO()
+        writer = csv.DictWriter(text, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        # Names far above anything generate_catalog makes, so every row is new
+        writer.writerows(synthetic_plant_rows(rows, rng, start=10 ** 8))
+        upload = io.BytesIO(text.getvalue().encode())
+
+        def run(user):
+            result = PlantCSVImporter(user=user).run(upload)
+            if result.get('error_count'):
+                raise CommandError(f"CSV import reported errors: {result['errors'][:3]}")
+        return self.time_rolled_back(
+            rows, run, lambda: get_user_model().objects.create(username='benchmark-import-user')
+        )
+
+    def time_sync(self, rows, rng):
+        plant_ids = list(Plant.objects.values_list('id', flat=True)[:rows])
+        stock = [
+            (plant_ids[i % len(plant_ids)], SIZES[i // len(plant_ids) % len(SIZES)],
+             rng.randint(0, 100), f'{rng.uniform(2, 150):.2f}')
+            for i in range(rows)
+        ]
+
+        def upload(stock_rows):
+            text = io.StringIO()
+            writer = csv.writer(text)
+            writer.writerow(['plant_id', 'size', 'quantity', 'price'])
+            writer.writerows(stock_rows)
+            return io.BytesIO(text.getvalue().encode())
+
+        def setup():
+            nursery = get_user_model().objects.create(username='benchmark-sync-nursery')
+            # Half the rows already exist, so the timed sync both updates and creates
+            InventorySync(nursery).run(upload(stock[::2]))
+            return nursery
+
+        def run(nursery):
+            result = InventorySync(nursery).run(upload(stock))
+            if result['error_count']:
+                raise CommandError(f"Inventory sync reported errors: {result['errors'][:3]}")
+        return self.time_rolled_back(rows, run, setup)
+
+    def time_rolled_back(self, rows, run, setup):
+        """Time ``run(setup())`` inside a transaction that is then rolled back"""
+        try:
+            with transaction.atomic():
+                context = setup()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    run(context)
+                    elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        return {
+            'rows': rows,
+            'seconds': round(elapsed, 4),
+            'rows_per_second': round(rows / elapsed, 1),
+            'queries': len(captured),
+        }
+
+
+def summarize(timings, queries):
+    timings = sorted(timings)
+    return {
+        'requests': len(timings),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': max(queries),
+    }
+
+
+def percentile(ordered, pct):
+    index = (len(ordered) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def compare(baseline, current, tolerance):
+    """Describe every measurement that is worse than ``baseline`` allows"""
+    regressions = []
+    for name, measurement in current['latency'].items():
+        before = baseline.get('latency', {}).get(name)
+        if not before:
+            continue
+        if measurement['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {before['p50_ms']} ms -> {measurement['p50_ms']} ms")
+        if measurement['queries'] > before['queries']:
+            regressions.append(f"{name}: {before['queries']} -> {measurement['queries']} queries")
+    for name, measurement in current['throughput'].items():
+        before = baseline.get('throughput', {}).get(name)
+        if not before:
+            continue
+        if measurement['rows_per_second'] < before['rows_per_second'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {before['rows_per_second']} -> {measurement['rows_per_second']} rows/s"
+            )
+    return regressions
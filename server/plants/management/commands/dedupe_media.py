@@ -0,0 +1,126 @@
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from plants.models import ImageBlob, Plant, PlantImage
+from plants.renditions import FORMATS, IMAGE_FIELDS, rendition_name
+from plants.storage import BLOB_PREFIX, image_storage
+
+
+class Command(BaseCommand):
+    help = ('Move plant images uploaded before content-addressed storage into it, '
+            'storing identical files once, then recount blob references')
+
+    def handle(self, *args, **options):
+        storage = image_storage()
+        moved = missing = reclaimed = 0
+        renamed = {}
+        # new name -> renditions moved to names derived from it
+        moved_renditions = {}
+
+        for model in (Plant, PlantImage):
+            image_field, renditions_field = IMAGE_FIELDS[model]
+            rows = model.objects.exclude(**{image_field: ''}).exclude(
+                **{f'{image_field}__startswith': BLOB_PREFIX}
+            ).only('id', image_field, renditions_field)
+            for instance in rows.iterator(chunk_size=1000):
+                old_name = getattr(instance, image_field).name
+                if old_name not in renamed:
+                    if not storage.exists(old_name):
+                        missing += 1
+                        self.stderr.write(f'{model.__name__} {instance.pk}: {old_name} is missing')
+                        continue
+                    with storage.open(old_name, 'rb') as f:
+                        renamed[old_name] = storage.save(old_name, File(f))
+                new_name = renamed[old_name]
+
+                # Existing renditions stay valid, but go where the blob's
+                # name says, so they are found and deleted along with it
+                renditions = getattr(instance, renditions_field)
+                if renditions.get('source') == old_name:
+                    if new_name in moved_renditions:
+                        # Another file with the same bytes brought its own
+                        self.delete_renditions(renditions, keep=moved_renditions[new_name])
+                    else:
+                        moved_renditions[new_name] = self.move_renditions(renditions, new_name)
+                    renditions = moved_renditions[new_name]
+                model.objects.filter(pk=instance.pk).update(
+                    **{image_field: new_name, renditions_field: renditions}
+                )
+                moved += 1
+
+        for old_name in renamed:
+            reclaimed += storage.size(old_name)
+            storage.delete(old_name)
+        # Duplicates stored once still cost their first copy
+        reclaimed -= sum(
+            ImageBlob.objects.filter(name__in=set(renamed.values())).values_list('size', flat=True)
+        )
+
+        orphans = self.recount(storage)
+        unrendered = sum(1 for renditions in moved_renditions.values() if not renditions)
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} images from {len(renamed)} files into {len(set(renamed.values()))} '
+            f'blobs, reclaiming {max(reclaimed, 0) / 1024 / 1024:.1f} MB; '
+            f'{missing} missing, {orphans} unreferenced blobs removed'
+        ))
+        if unrendered:
+            self.stdout.write(f'{unrendered} blobs lost renditions with missing files; '
+                              f'run backfill_renditions')
+
+    def move_renditions(self, renditions, new_name):
+        """Move rendition files to the names derived from ``new_name``.
+
+        Returns the renditions field for the new name, or an empty one, for
+        backfill_renditions to fill, if any of the files is missing.
+        """
+        moved = {'source': new_name}
+        for size, entry in renditions.items():
+            if size == 'source':
+                continue
+            moved[size] = entry = dict(entry)
+            for fmt in FORMATS:
+                old, new = entry.get(fmt), rendition_name(new_name, size, fmt)
+                if old != new and old and default_storage.exists(old):
+                    if not default_storage.exists(new):
+                        with default_storage.open(old, 'rb') as f:
+                            new = default_storage.save(new, File(f))
+                    default_storage.delete(old)
+                elif not default_storage.exists(new):
+                    return {}
+                entry[fmt] = new
+        return moved
+
+    def delete_renditions(self, renditions, keep=None):
+        keep = {
+            entry.get(fmt) for size, entry in (keep or {}).items() if size != 'source'
+            for fmt in FORMATS
+        }
+        for size, entry in renditions.items():
+            if size == 'source':
+                continue
+            for fmt in FORMATS:
+                if entry.get(fmt) and entry[fmt] not in keep:
+                    default_storage.delete(entry[fmt])
+
+    def recount(self, storage):
+        """Set every blob's reference count from the rows that point at it"""
+        counts = Counter()
+        for model in (Plant, PlantImage):
+            image_field = IMAGE_FIELDS[model][0]
+            counts.update(
+                model.objects.filter(**{f'{image_field}__startswith': BLOB_PREFIX})
+                .values_list(image_field, flat=True)
+            )
+        orphans = 0
+        for blob in ImageBlob.objects.all().iterator(chunk_size=1000):
+            references = counts.get(blob.name, 0)
+            if not references:
+                blob.delete()
+                storage.remove(blob.name)
+                orphans += 1
+            elif references != blob.references:
+                ImageBlob.objects.filter(pk=blob.pk).update(references=references)
+        return orphans
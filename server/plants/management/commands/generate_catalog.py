@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from plants.synthetic import clear_catalog, generate_catalog
+
+
+class Command(BaseCommand):
+    help = ('Bulk-insert a synthetic catalog of plants, nurseries, inventory and '
+            'photos for load testing; --clear removes what earlier runs made')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plants', type=int, default=1000)
+        parser.add_argument('--nurseries', type=int, default=50)
+        parser.add_argument('--inventory', type=int, default=5000)
+        parser.add_argument('--photos', type=int, default=20,
+                            help='Distinct images, shared between the plants')
+        parser.add_argument('--additional-images', type=int, default=2,
+                            help='Gallery images per plant')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete synthetic data from earlier runs first')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_catalog()
+            self.stdout.write('Removed earlier synthetic data')
+        counts = generate_catalog(
+            plants=options['plants'],
+            nurseries=options['nurseries'],
+            inventory=options['inventory'],
+            photos=options['photos'],
+            additional_images=options['additional_images'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(f'  {message}'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['plants']} plants, {counts['nurseries']} nurseries, "
+            f"{counts['inventory']} inventory rows and {counts['photos']} photos"
+        ))
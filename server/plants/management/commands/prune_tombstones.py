@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from plants.changes import prune_deletions
+
+class Command(BaseCommand):
+    help = 'Delete change feed tombstones older than PLANTS_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted = prune_deletions()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from plants.availability import refresh_availability
+from plants.models import PlantAvailability
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-plant inventory availability summary table'
+
+    def handle(self, *args, **options):
+        refresh_availability()
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed availability for {PlantAvailability.objects.count()} plants'
+        ))
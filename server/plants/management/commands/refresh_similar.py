@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from plants.similarity import rebuild_similar
+
+class Command(BaseCommand):
+    help = 'Recompute the similar plant recommendations of every plant'
+
+    def handle(self, *args, **options):
+        count = rebuild_similar()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed similar plants for {count} plants'))
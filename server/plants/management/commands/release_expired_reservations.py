@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from plants.reservations import release_expired
+
+class Command(BaseCommand):
+    help = 'Return the stock held by expired reservations; safe to run from cron'
+
+    def handle(self, *args, **options):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(
+            f'Released {len(released)} expired reservations'
+        ))
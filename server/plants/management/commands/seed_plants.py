@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from plants.models import Plant
+from plants.importers import PlantCSVImporter
 from django.contrib.auth.models import User
 
 class Command(BaseCommand):
@@ -54,11 +54,12 @@ class Command(BaseCommand):
             }
         ]
 
-        for plant_data in basic_plants:
-            plant_data['created_by'] = system_user
-            Plant.objects.get_or_create(
-                scientific_name=plant_data['scientific_name'],
-                defaults=plant_data
-            )
+        # Upsert keyed on scientific name: one lookup query for the batch
+        importer = PlantCSVImporter(user=system_user, mode='upsert')
+        result = importer.run_rows(enumerate(basic_plants, start=1))
+        if result['error_count']:
+            for error in result['errors']:
+                self.stderr.write(f"{error['common_name']}: {error['error']}")
+            return
 
         self.stdout.write(self.style.SUCCESS('Successfully seeded basic plant database'))
\ No newline at end of file
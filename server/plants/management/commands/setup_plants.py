@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from server.plants.models import Plant, PlantImage
+from plants.importers import PlantCSVImporter
 
 class Command(BaseCommand):
     help = 'Initialize plants database with sample data'
@@ -70,14 +70,17 @@ class Command(BaseCommand):
             }
         ]
 
-        # Create the sample plants
-        for plant_data in plants_data:
-            plant, created = Plant.objects.get_or_create(
-                common_name=plant_data['common_name'],
-                defaults={**plant_data, 'created_by': user}
-            )
-            status = 'Created' if created else 'Already exists'
-            self.stdout.write(self.style.SUCCESS(f'{status}: {plant.common_name}'))
+        # Create or refresh the sample plants, matched on common name
+        importer = PlantCSVImporter(user=user, mode='upsert', key_fields=('common_name',))
+        result = importer.run_rows(enumerate(plants_data, start=1))
+        if result['error_count']:
+            for error in result['errors']:
+                self.stderr.write(f"{error['common_name']}: {error['error']}")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['count']}, updated {result['updated']}, "
+            f"unchanged {result['unchanged']}"
+        ))
 
         # Generate CSV file with sample data
         import csv
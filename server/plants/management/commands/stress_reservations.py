@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+
+from plants.models import Plant, PlantInventory, StockReservation
+from plants.reservations import InsufficientStock, release, reserve
+
+
+class Command(BaseCommand):
+    help = ('Race many threads reserving the same inventory row and check that '
+            'exactly the available stock is handed out. Creates its own nursery '
+            'and inventory row and deletes them afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=100)
+        parser.add_argument('--reservers', type=int, default=500,
+                            help='Concurrent reservation attempts, one unit each')
+        parser.add_argument('--threads', type=int, default=64)
+
+    def handle(self, *args, **options):
+        plant = Plant.objects.first()
+        if plant is None:
+            raise CommandError('No plants to stock; run seed_plants first')
+
+        nursery = get_user_model().objects.create(username='stress-reservations-nursery')
+        try:
+            inventory = PlantInventory.objects.create(
+                plant=plant, nursery=nursery, quantity=options['stock'], price=1, size='stress'
+            )
+            self.race(inventory, options)
+        finally:
+            nursery.delete()
+
+    def race(self, inventory, options):
+        outcomes = Counter()
+        lock = threading.Lock()
+        start = threading.Barrier(min(options['threads'], options['reservers']))
+
+        def attempt(n):
+            if n < start.parties:
+                start.wait()
+            try:
+                reserve([(inventory.pk, 1)])
+                outcome = 'reserved'
+            except InsufficientStock:
+                outcome = 'sold out'
+            except Exception as e:
+                outcome = f'error: {type(e).__name__}'
+            finally:
+                connection.close()
+            with lock:
+                outcomes[outcome] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(attempt, range(options['reservers'])))
+        elapsed = time.perf_counter() - started
+        close_old_connections()
+
+        inventory.refresh_from_db()
+        held = list(StockReservation.objects.filter(inventory=inventory, status='held'))
+        held_quantity = sum(reservation.quantity for reservation in held)
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f'{outcome:<24} {count}')
+        self.stdout.write(f'{options["reservers"]} attempts in {elapsed:.2f}s; '
+                          f'{inventory.quantity} left, {held_quantity} held')
+
+        problems = []
+        if inventory.quantity < 0:
+            problems.append(f'stock went negative ({inventory.quantity})')
+        if inventory.quantity + held_quantity != options['stock']:
+            problems.append('stock left plus stock held does not match the starting stock')
+        if outcomes['reserved'] != held_quantity:
+            problems.append('successful reservations do not match the stock held')
+
+        release(held)
+        inventory.refresh_from_db()
+        if inventory.quantity != options['stock']:
+            problems.append(f'releasing every hold left {inventory.quantity} of {options["stock"]}')
+
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No oversell; releasing restored all stock'))
@@ -0,0 +1,58 @@
+import sqlite3
+from contextlib import closing
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from plants.models import NurseryProfile
+
+NURSERY_QUERY = """
+    SELECT username, name, address, latitude, longitude, service_radius
+    FROM users WHERE role = 'nursery'
+"""
+
+
+class Command(BaseCommand):
+    help = ("Create or update nursery profiles from the nursery accounts in the Node "
+            "app's users table, matched to Django users on username")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=settings.PLANTS_NODE_DATABASE,
+            help='SQLite file of the Node app (default: PLANTS_NODE_DATABASE)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with closing(sqlite3.connect(f"file:{options['database']}?mode=ro", uri=True)) as source:
+                rows = source.execute(NURSERY_QUERY).fetchall()
+        except sqlite3.Error as e:
+            raise CommandError(f"Can't read nursery accounts from {options['database']}: {e}")
+
+        users = User.objects.in_bulk([row[0] for row in rows], field_name='username')
+        synced = unlocated = unmatched = 0
+        for username, name, address, latitude, longitude, service_radius in rows:
+            if latitude is None or longitude is None or not (
+                -90 <= latitude <= 90 and -180 <= longitude <= 180
+            ):
+                unlocated += 1
+                continue
+            user = users.get(username)
+            if user is None:
+                unmatched += 1
+                self.stderr.write(f'{username}: no Django user with this username')
+                continue
+            NurseryProfile.objects.update_or_create(nursery=user, defaults={
+                'name': name or '',
+                'address': address or '',
+                'latitude': latitude,
+                'longitude': longitude,
+                'service_radius': service_radius,
+            })
+            synced += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Synced {synced} nursery profiles; {unlocated} nurseries have no location, '
+            f'{unmatched} have no Django user'
+        ))
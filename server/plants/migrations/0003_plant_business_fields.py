@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:54
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0002_plant_deer_resistant_plant_drought_tolerant_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='featured',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)]),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='quantity',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='fertilizer_requirements',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='hardiness_zone',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='native_region',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='planting_instructions',
+            field=models.TextField(),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='soil_type',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='time_to_maturity',
+            field=models.CharField(max_length=100),
+        ),
+    ]
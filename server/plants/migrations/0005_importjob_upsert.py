@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0004_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='key',
+            field=models.CharField(choices=[('scientific_name', 'Scientific name'), ('common_name', 'Common name'), ('scientific_name,common_name', 'Scientific and common name')], default='scientific_name', help_text='Natural key plants are matched on in upsert mode', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('create', 'Create'), ('upsert', 'Upsert')], default='create', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_unchanged',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_updated',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:58
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_FIELDS = (
+    ('common_name', 'A'),
+    ('scientific_name', 'A'),
+    ('native_region', 'B'),
+    ('description', 'C'),
+    ('care_instructions', 'D'),
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX plants_plant_search_gin ON plants_plant USING gin (search_vector)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX plants_plant_common_name_trgm ON plants_plant "
+            "USING gin (common_name gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX plants_plant_scientific_name_trgm ON plants_plant "
+            "USING gin (scientific_name gin_trgm_ops)"
+        )
+        vector = None
+        for field, weight in SEARCH_FIELDS:
+            part = SearchVector(field, weight=weight, config='english')
+            vector = part if vector is None else vector + part
+        apps.get_model('plants', 'Plant').objects.update(search_vector=vector)
+    elif vendor == 'sqlite':
+        columns = ', '.join(field for field, _ in SEARCH_FIELDS)
+        schema_editor.execute(f"CREATE VIRTUAL TABLE plants_plant_fts USING fts5({columns})")
+        schema_editor.execute(
+            f"INSERT INTO plants_plant_fts (rowid, {columns}) SELECT id, {columns} FROM plants_plant"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS plants_plant_search_gin")
+        schema_editor.execute("DROP INDEX IF EXISTS plants_plant_common_name_trgm")
+        schema_editor.execute("DROP INDEX IF EXISTS plants_plant_scientific_name_trgm")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS plants_plant_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0005_importjob_upsert'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
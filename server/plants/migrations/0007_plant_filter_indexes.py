@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0006_plant_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['light_requirement', 'water_requirement', 'common_name'], name='plant_light_water_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['indoor_suitable', 'common_name'], name='plant_indoor_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['growth_rate', 'common_name'], name='plant_growth_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['flowering_season', 'common_name'], name='plant_flowering_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['price'], name='plant_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['mature_height'], name='plant_height_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['temperature_min', 'temperature_max'], name='plant_temperature_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(condition=models.Q(('drought_tolerant', True)), fields=['common_name'], name='plant_drought_tolerant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(condition=models.Q(('deer_resistant', True)), fields=['common_name'], name='plant_deer_resistant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(condition=models.Q(('edible', True)), fields=['common_name'], name='plant_edible_idx'),
+        ),
+    ]
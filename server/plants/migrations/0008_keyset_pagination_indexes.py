@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0007_plant_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['common_name', 'id'], name='plant_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['updated_at', 'id'], name='plant_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantinventory',
+            index=models.Index(fields=['updated_at', 'id'], name='inventory_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantinventory',
+            index=models.Index(fields=['nursery', 'updated_at', 'id'], name='inventory_nursery_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def build_availability(apps, schema_editor):
+    PlantInventory = apps.get_model('plants', 'PlantInventory')
+    PlantAvailability = apps.get_model('plants', 'PlantAvailability')
+    totals = PlantInventory.objects.values('plant').annotate(
+        total_quantity=Sum('quantity'),
+        min_price=Min('price'),
+        max_price=Max('price'),
+        nursery_count=Count('nursery', distinct=True),
+    ).order_by()
+    PlantAvailability.objects.bulk_create(
+        [PlantAvailability(plant_id=row.pop('plant'), **row) for row in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlantAvailability',
+            fields=[
+                ('plant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability', serialize=False, to='plants.plant')),
+                ('total_quantity', models.IntegerField(default=0)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('nursery_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Plant availability',
+            },
+        ),
+        migrations.RunPython(build_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:15
+
+import plants.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0013_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('references', models.IntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='plant',
+            name='main_image',
+            field=models.ImageField(storage=plants.storage.image_storage, upload_to='plants/main/'),
+        ),
+        migrations.AlterField(
+            model_name='plantimage',
+            name='image',
+            field=models.ImageField(storage=plants.storage.image_storage, upload_to='plants/additional/'),
+        ),
+    ]
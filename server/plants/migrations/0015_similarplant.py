@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0014_image_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarPlant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('distance', models.FloatField()),
+                ('plant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_plants', to='plants.plant')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='plants.plant')),
+            ],
+            options={
+                'ordering': ['plant', 'rank'],
+                'unique_together': {('plant', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+from plants.attributes import parse_available_months, parse_hardiness_zone
+
+BATCH_SIZE = 2000
+
+
+def backfill(apps, schema_editor):
+    Plant = apps.get_model('plants', 'Plant')
+    PlantInventory = apps.get_model('plants', 'PlantInventory')
+
+    plants = []
+    for plant in Plant.objects.only('id', 'hardiness_zone').iterator(chunk_size=BATCH_SIZE):
+        plant.hardiness_zone_min, plant.hardiness_zone_max = parse_hardiness_zone(plant.hardiness_zone)
+        plants.append(plant)
+    Plant.objects.bulk_update(plants, ['hardiness_zone_min', 'hardiness_zone_max'], batch_size=BATCH_SIZE)
+
+    # Blank text already has the every-month default
+    items = []
+    for item in PlantInventory.objects.exclude(seasonal_availability='').only(
+        'id', 'seasonal_availability'
+    ).iterator(chunk_size=BATCH_SIZE):
+        item.available_months = parse_available_months(item.seasonal_availability)
+        items.append(item)
+    PlantInventory.objects.bulk_update(items, ['available_months'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0015_similarplant'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='hardiness_zone_max',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='hardiness_zone_min',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='plantinventory',
+            name='available_months',
+            field=models.PositiveSmallIntegerField(default=4095, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['hardiness_zone_min', 'hardiness_zone_max'], name='plant_zone_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
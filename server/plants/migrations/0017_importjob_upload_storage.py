@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:58
+
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations, models
+
+import plants.storage
+
+
+def move_uploads(apps, schema_editor):
+    """Take uploads out of MEDIA_ROOT: unfinished jobs' move, the rest go"""
+    ImportJob = apps.get_model('plants', 'ImportJob')
+    media = FileSystemStorage()
+    uploads = plants.storage.import_storage()
+    for job in ImportJob.objects.exclude(file=''):
+        name = job.file.name
+        if not media.exists(name):
+            continue
+        if job.status in ('pending', 'running'):
+            with media.open(name) as file:
+                ImportJob.objects.filter(pk=job.pk).update(file=uploads.save(name, file))
+        else:
+            ImportJob.objects.filter(pk=job.pk).update(file='')
+        media.delete(name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0016_structured_zone_months'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(storage=plants.storage.import_storage, upload_to='imports/'),
+        ),
+        migrations.RunPython(move_uploads, migrations.RunPython.noop),
+    ]
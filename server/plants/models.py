@@ -1,6 +1,11 @@
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
+
+from .attributes import ALL_MONTHS, parse_available_months, parse_hardiness_zone
+from .storage import image_storage, import_storage
 
 class Plant(models.Model):
     LIGHT_CHOICES = [
@@ -59,6 +64,10 @@ class Plant(models.Model):
 
     # Additional Characteristics
     hardiness_zone = models.CharField(max_length=50)
+    # USDA zone range read from hardiness_zone (plants.attributes); null
+    # when the text can't be read
+    hardiness_zone_min = models.PositiveSmallIntegerField(null=True, editable=False)
+    hardiness_zone_max = models.PositiveSmallIntegerField(null=True, editable=False)
     native_region = models.CharField(max_length=200)
     drought_tolerant = models.BooleanField(default=False)
     deer_resistant = models.BooleanField(default=False)
@@ -67,7 +76,9 @@ class Plant(models.Model):
     indoor_suitable = models.BooleanField(default=False)
 
     # Images
-    main_image = models.ImageField(upload_to='plants/main/')
+    main_image = models.ImageField(upload_to='plants/main/', storage=image_storage)
+    # Resized copies of main_image, written by plants.renditions
+    main_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     additional_images = models.ManyToManyField('PlantImage', blank=True)
 
     # Business Information
@@ -75,6 +86,9 @@ class Plant(models.Model):
     quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     featured = models.BooleanField(default=False)
 
+    # Search (maintained by plants.search; GIN indexed on PostgreSQL)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -82,18 +96,88 @@ class Plant(models.Model):
 
     class Meta:
         ordering = ['common_name']
+        # Back the faceted filters in plants.filters. Composite indexes end in
+        # common_name so a filtered page can be read in list order; rarely
+        # true flags get partial indexes that only hold the matching rows.
+        indexes = [
+            models.Index(fields=['light_requirement', 'water_requirement', 'common_name'],
+                         name='plant_light_water_name_idx'),
+            models.Index(fields=['indoor_suitable', 'common_name'], name='plant_indoor_name_idx'),
+            models.Index(fields=['growth_rate', 'common_name'], name='plant_growth_name_idx'),
+            models.Index(fields=['flowering_season', 'common_name'], name='plant_flowering_name_idx'),
+            models.Index(fields=['price'], name='plant_price_idx'),
+            models.Index(fields=['mature_height'], name='plant_height_idx'),
+            models.Index(fields=['temperature_min', 'temperature_max'], name='plant_temperature_idx'),
+            models.Index(fields=['hardiness_zone_min', 'hardiness_zone_max'], name='plant_zone_idx'),
+            models.Index(fields=['common_name'], condition=models.Q(drought_tolerant=True),
+                         name='plant_drought_tolerant_idx'),
+            models.Index(fields=['common_name'], condition=models.Q(deer_resistant=True),
+                         name='plant_deer_resistant_idx'),
+            models.Index(fields=['common_name'], condition=models.Q(edible=True),
+                         name='plant_edible_idx'),
+            # Keyset pagination (plants.pagination)
+            models.Index(fields=['common_name', 'id'], name='plant_name_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='plant_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.common_name} ({self.scientific_name})"
 
+    def save(self, *args, **kwargs):
+        self.fill_hardiness_zone()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'hardiness_zone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'hardiness_zone_min', 'hardiness_zone_max'}
+        super().save(*args, **kwargs)
+
+    def fill_hardiness_zone(self):
+        """Set the zone range from hardiness_zone; bulk writes call this themselves"""
+        self.hardiness_zone_min, self.hardiness_zone_max = parse_hardiness_zone(self.hardiness_zone)
+
+class ImageBlob(models.Model):
+    """A content-addressed image file and how many image fields point at it"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    references = models.IntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+
 class PlantImage(models.Model):
-    image = models.ImageField(upload_to='plants/additional/')
+    image = models.ImageField(upload_to='plants/additional/', storage=image_storage)
+    # Resized copies of image, written by plants.renditions
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Image for {self.plant_set.first().common_name if self.plant_set.exists() else 'Unassigned'}"
 
+class NurseryProfile(models.Model):
+    """Where a nursery is, mirroring the location fields of the Node user table.
+
+    Filled from that table by ``sync_nursery_profiles``; nurseries without a
+    profile never match ``?near=``.
+    """
+    nursery = models.OneToOneField(User, on_delete=models.CASCADE, related_name='nursery_profile')
+    name = models.CharField(max_length=200, blank=True)
+    address = models.CharField(max_length=300, blank=True)
+    latitude = models.FloatField(validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    service_radius = models.FloatField(null=True, blank=True, help_text="Delivery radius in kilometres")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Bounding-box prefilter for ?near= searches (plants.geo)
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='nursery_lat_lng_idx'),
+        ]
+
+    def __str__(self):
+        return self.name or self.nursery.username
+
 class PlantInventory(models.Model):
     plant = models.ForeignKey(Plant, on_delete=models.CASCADE)
     nursery = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -102,12 +186,171 @@ class PlantInventory(models.Model):
     size = models.CharField(max_length=50)  # e.g., "2 gallon", "4 inch pot"
     notes = models.TextField(blank=True)
     seasonal_availability = models.CharField(max_length=200, blank=True)
+    # Months read from seasonal_availability, bit 0 for January
+    # (plants.attributes); null when the text can't be read
+    available_months = models.PositiveSmallIntegerField(null=True, default=ALL_MONTHS, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Plant inventories"
         unique_together = ('plant', 'nursery', 'size')
+        # Keyset pagination (plants.pagination), overall and per nursery
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='inventory_updated_id_idx'),
+            models.Index(fields=['nursery', 'updated_at', 'id'], name='inventory_nursery_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.plant.common_name} - {self.nursery.username} ({self.size})"
+
+    def save(self, *args, **kwargs):
+        self.fill_available_months()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'seasonal_availability' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'available_months'}
+        super().save(*args, **kwargs)
+
+    def fill_available_months(self):
+        """Set available_months from seasonal_availability; bulk writes call this themselves"""
+        self.available_months = parse_available_months(self.seasonal_availability)
+
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    MODE_CHOICES = [
+        ('create', 'Create'),
+        ('upsert', 'Upsert'),
+    ]
+
+    KEY_CHOICES = [
+        ('scientific_name', 'Scientific name'),
+        ('common_name', 'Common name'),
+        ('scientific_name,common_name', 'Scientific and common name'),
+    ]
+
+    file = models.FileField(upload_to='imports/', storage=import_storage)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='create')
+    key = models.CharField(max_length=100, choices=KEY_CHOICES, default='scientific_name',
+                           help_text="Natural key plants are matched on in upsert mode")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_processed = models.IntegerField(default=0)
+    rows_created = models.IntegerField(default=0)
+    rows_updated = models.IntegerField(default=0)
+    rows_unchanged = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    chunks_done = models.IntegerField(default=0)
+    message = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import {self.pk} ({self.status})"
+
+    @property
+    def duration(self):
+        """Seconds spent running so far, or in total once finished"""
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
+
+    @property
+    def throughput(self):
+        """Rows processed per second"""
+        duration = self.duration
+        if not duration:
+            return None
+        return round(self.rows_processed / duration, 1)
+
+class PlantAvailability(models.Model):
+    """Materialized per-plant inventory totals, kept current by plants.availability"""
+    plant = models.OneToOneField(Plant, on_delete=models.CASCADE, primary_key=True,
+                                 related_name='availability')
+    total_quantity = models.IntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    nursery_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Plant availability"
+
+    def __str__(self):
+        return f"{self.plant_id}: {self.total_quantity} at {self.nursery_count} nurseries"
+
+class SimilarPlant(models.Model):
+    """One of a plant's nearest neighbours, precomputed by plants.similarity"""
+    plant = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='similar_plants')
+    similar = models.ForeignKey(Plant, on_delete=models.CASCADE, related_name='similar_to')
+    rank = models.PositiveSmallIntegerField()
+    distance = models.FloatField()
+
+    class Meta:
+        ordering = ['plant', 'rank']
+        # Backs the /similar/ lookup, read in rank order
+        unique_together = ('plant', 'rank')
+
+    def __str__(self):
+        return f"{self.plant_id} -> {self.similar_id} (#{self.rank})"
+
+class StockReservation(models.Model):
+    """Stock held back from a PlantInventory row until checkout or expiry"""
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+    ]
+
+    inventory = models.ForeignKey(PlantInventory, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.IntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='held')
+    reserved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Expiry sweeps only look at held reservations
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.inventory_id} ({self.status})"
+
+    @property
+    def is_expired(self):
+        return self.status == 'held' and self.expires_at <= timezone.now()
+
+class DeletedRecord(models.Model):
+    """Tombstone for a deleted plant or inventory row, read by plants.changes"""
+    KIND_CHOICES = [
+        ('plant', 'Plant'),
+        ('inventory', 'Plant inventory'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'deleted_at', 'id'], name='deleted_record_feed_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.plant.common_name} - {self.nursery.username} ({self.size})"
\ No newline at end of file
+        return f"{self.kind} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,176 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on ``(ordering field, id)``.
+
+    Each page is fetched with ``WHERE (field, id) > (last field, last id)``
+    against a matching index instead of ``OFFSET``, so deep pages cost the
+    same as the first one. Clients follow the opaque ``next`` link; pass
+    ``?count=false`` to skip the ``COUNT(*)`` when the total isn't needed.
+    ``?ordering=`` picks one of ``orderings``, with a ``-`` prefix for
+    descending order. Requests that still send ``?page=`` are served with
+    page-number pagination so existing clients keep working, as are results
+    the view reports as ranked (by search relevance or distance), which have
+    no stable key, unless an explicit ``?ordering=`` is given.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    count_query_param = 'count'
+    orderings = ()
+    default_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None, count_queryset=None):
+        """Rows of the requested page; ``count_queryset``, when given, is counted instead"""
+        if self.use_page_numbers(request, view):
+            self.legacy = PageNumberPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        page = self.page_queryset(queryset, request)
+        if self.wants_count(request):
+            self.count = (queryset if count_queryset is None else count_queryset).order_by().count()
+        return self.take_page(list(page[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` through the async ORM"""
+        if self.use_page_numbers(request, view):
+            legacy = self.legacy = PageNumberPagination()
+            legacy.request = request
+            paginator = legacy.django_paginator_class(queryset, legacy.get_page_size(request))
+            # Counted up front, so that page() only slices the queryset
+            paginator.count = await queryset.acount()
+            try:
+                legacy.page = paginator.page(legacy.get_page_number(request, paginator))
+            except InvalidPage as exc:
+                raise NotFound(legacy.invalid_page_message.format(
+                    page_number=legacy.get_page_number(request, paginator), message=str(exc)
+                ))
+            legacy.page.object_list = [obj async for obj in legacy.page.object_list]
+            return legacy.page.object_list
+
+        page = self.page_queryset(queryset, request)
+        if self.wants_count(request):
+            self.count = await queryset.order_by().acount()
+        return self.take_page([obj async for obj in page[:self.page_size + 1]])
+
+    def use_page_numbers(self, request, view):
+        self.request = request
+        self.legacy = None
+        ranked = (
+            view is not None and getattr(view, 'has_ranked_ordering', None) and
+            view.has_ranked_ordering() and not request.query_params.get(self.ordering_query_param)
+        )
+        return 'page' in request.query_params or ranked
+
+    def wants_count(self, request):
+        self.count = None
+        return request.query_params.get(self.count_query_param, '').lower() != 'false'
+
+    def page_queryset(self, queryset, request):
+        """``queryset`` ordered and filtered to the rows after the cursor"""
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request)
+        direction = '-' if self.descending else ''
+
+        queryset = queryset.order_by(f'{direction}{self.field}', f'{direction}id')
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            value, pk = cursor
+            op = 'lt' if self.descending else 'gt'
+            # The redundant inclusive bound lets the database start an index
+            # range scan at the cursor instead of evaluating the OR per row.
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{op}e': value}),
+                Q(**{f'{self.field}__{op}': value}) |
+                Q(**{self.field: value, f'id__{op}': pk})
+            )
+        return queryset
+
+    def take_page(self, results):
+        """Trim the one-row lookahead and remember where the page ended"""
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.last = results[-1] if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        field = ordering.lstrip('-')
+        if field not in self.orderings:
+            raise ValidationError({
+                self.ordering_query_param: f"Choose from {', '.join(self.orderings)}"
+            })
+        return field, ordering.startswith('-')
+
+    def encode_cursor(self, instance):
+        if isinstance(instance, dict):
+            # A .values() row, see plants.fast_lists
+            value, pk = instance[self.field], instance['id']
+        else:
+            value, pk = getattr(instance, self.field), instance.pk
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps([value, pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            value = model._meta.get_field(self.field).to_python(value)
+            if value is None:
+                # Ordering fields are never null, and None can't be compared
+                raise ValueError("null cursor value")
+            return value, int(pk)
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound("Invalid cursor")
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+
+class PlantPagination(KeysetPagination):
+    orderings = ('common_name', 'updated_at')
+    default_ordering = 'common_name'
+
+
+class InventoryPagination(KeysetPagination):
+    orderings = ('updated_at',)
+    default_ordering = 'updated_at'
@@ -0,0 +1,51 @@
+# Optional: the fast-json extra
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+# orjson writes floats outside this range in a different notation than the
+# stdlib (1e16 rather than 1e+16, 0.00001 rather than 1e-05)
+PLAIN_FLOAT_RANGE = (1e-4, 1e16)
+
+
+def is_plain(value):
+    """True if orjson and the stdlib encode ``value`` to the same bytes"""
+    kind = type(value)
+    if kind is float:
+        return value == 0 or PLAIN_FLOAT_RANGE[0] <= abs(value) < PLAIN_FLOAT_RANGE[1]
+    if kind is dict:
+        return all(type(key) is str and is_plain(item) for key, item in value.items())
+    if kind is list:
+        return all(is_plain(item) for item in value)
+    return value is None or kind in (str, int, bool)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that goes through orjson, when installed, for plain data.
+
+    Views mark a response as safe for it by setting ``response.plain_json``
+    once they know its data only holds types that orjson encodes exactly
+    like JSONRenderer (see ``is_plain``). Everything else, and indented
+    output, is left to JSONRenderer, so the bytes never differ.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if (
+            orjson is None or data is None or not getattr(response, 'plain_json', False) or
+            not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON) or
+            self.get_indent(accepted_media_type, renderer_context)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer for the benefit of JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
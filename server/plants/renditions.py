@@ -0,0 +1,163 @@
+"""Resized copies of plant photos.
+
+Uploads are often multi-megabyte phone photos. When a plant's
+``main_image`` or a PlantImage's ``image`` changes, a background pool writes
+every size in RENDITIONS in each format in FORMATS next to the original
+and records their storage names on the row (``main_image_renditions`` and
+``renditions``), so that serializers can link to them without touching
+storage. ``backfill_renditions`` does the same for images uploaded before.
+"""
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_version
+from .executors import get_executor
+from .models import Plant, PlantImage
+
+logger = logging.getLogger(__name__)
+
+# name -> bounding box; images are scaled down to fit, never up
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+# name -> (Pillow format, encoder options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# model -> (image field, renditions field)
+IMAGE_FIELDS = {
+    Plant: ('main_image', 'main_image_renditions'),
+    PlantImage: ('image', 'renditions'),
+}
+
+
+def rendition_name(name, size, fmt):
+    stem = posixpath.splitext(name)[0]
+    return f'renditions/{size}/{stem}.{fmt}'
+
+
+def delete_renditions(name, storage=default_storage):
+    """Remove every rendition made from the file ``name``"""
+    for size in RENDITIONS:
+        for fmt in FORMATS:
+            storage.delete(rendition_name(name, size, fmt))
+
+
+def render(field_file, storage=default_storage):
+    """Write every rendition of ``field_file`` and describe them.
+
+    Returns ``{'source': name, size: {'width', 'height', format: name}}``.
+    """
+    largest = max(max(box) for box in RENDITIONS.values())
+    with field_file.open('rb'):
+        image = Image.open(field_file)
+        # JPEGs can be decoded at a fraction of their size, which is much
+        # cheaper than decoding a full phone photo and scaling it down
+        image.draft('RGB', (largest * 2, largest * 2))
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    renditions = {'source': field_file.name}
+    # Largest first, each one scaled from the last
+    for size, box in sorted(RENDITIONS.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail(box, Image.LANCZOS)
+        entry = {'width': image.width, 'height': image.height}
+        for fmt, (pil_format, options) in FORMATS.items():
+            frame = image.convert('RGB') if pil_format == 'JPEG' else image
+            buffer = io.BytesIO()
+            frame.save(buffer, pil_format, **options)
+            name = rendition_name(field_file.name, size, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            entry[fmt] = storage.save(name, ContentFile(buffer.getvalue()))
+        renditions[size] = entry
+    return renditions
+
+
+def needs_renditions(instance):
+    image_field, renditions_field = IMAGE_FIELDS[type(instance)]
+    name = getattr(instance, image_field).name or ''
+    return getattr(instance, renditions_field).get('source', '') != name
+
+
+def find_renditions(name):
+    """Renditions already made for the same file on any row, if there are any"""
+    for model, (_, renditions_field) in IMAGE_FIELDS.items():
+        renditions = model.objects.filter(
+            **{f'{renditions_field}__source': name}
+        ).values_list(renditions_field, flat=True).first()
+        if renditions:
+            return renditions
+    return None
+
+
+def update_renditions(model, pk, reuse=True):
+    """Render the current image of one row and store the result on it
+
+    Content-addressed uploads (plants.storage) share a name when their bytes
+    match, so unless ``reuse`` is off a photo rendered for one row is not
+    rendered again for the next.
+    """
+    image_field, renditions_field = IMAGE_FIELDS[model]
+    instance = model.objects.only('id', image_field, renditions_field).get(pk=pk)
+    field_file = getattr(instance, image_field)
+    renditions = {}
+    if field_file:
+        renditions = (reuse and find_renditions(field_file.name)) or render(field_file)
+    # Only write if the image wasn't replaced while rendering; that save
+    # queued its own job.
+    updates = {renditions_field: renditions}
+    if model is Plant:
+        updates['updated_at'] = timezone.now()
+    if model.objects.filter(pk=pk, **{image_field: field_file.name or ''}).update(**updates):
+        bump_version(model)
+    return renditions
+
+
+def run_rendition_job(model, pk):
+    close_old_connections()
+    try:
+        update_renditions(model, pk)
+    except model.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception("Rendering %s %s failed", model.__name__, pk)
+    finally:
+        close_old_connections()
+
+
+def enqueue_renditions(instance):
+    """Render ``instance``'s image in the background once its save commits"""
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: get_executor('renditions').submit(run_rendition_job, model, pk))
+
+
+def rendition_urls(renditions, storage=default_storage):
+    """Public URLs for a renditions field, keyed by size and format"""
+    return {
+        size: {
+            key: storage.url(value) if key in FORMATS else value
+            for key, value in entry.items()
+        }
+        for size, entry in renditions.items()
+        if size in RENDITIONS
+    }
+
+
+def thumbnail_url(field_file, renditions, storage=default_storage):
+    """Smallest rendition of an image, falling back to the original"""
+    thumbnail = renditions.get('thumbnail')
+    return storage.url(thumbnail['jpeg']) if thumbnail else field_file.url
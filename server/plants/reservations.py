@@ -0,0 +1,119 @@
+"""Stock reservations that can't oversell.
+
+Reserving takes stock with one conditional UPDATE per inventory row,
+``quantity = quantity - n WHERE quantity >= n``, so two checkouts can never
+both spend the last unit and no lock is held beyond the reserving request's
+own transaction. Held stock goes back when a reservation is released or
+expires. Expired holds are swept lazily before new reservations on the same
+rows, and in bulk by the ``release_expired_reservations`` command.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_version_on_commit
+from .models import PlantAvailability, PlantInventory, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, inventory_id, requested):
+        self.inventory_id = inventory_id
+        self.requested = requested
+        super().__init__(f"Not enough stock on inventory {inventory_id} to reserve {requested}")
+
+
+def get_reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'PLANTS_RESERVATION_TTL', 900))
+
+
+def adjust_stock(quantities):
+    """Apply ``{inventory_id: change}`` to inventory and availability totals.
+
+    Negative changes only apply while enough stock is left; returns the id of
+    the first row that fell short, or None. Rows are visited in id order so
+    concurrent batches over the same rows can't deadlock.
+    """
+    now = timezone.now()
+    # Every statement is a write, so no transaction starts out reading and
+    # then has to upgrade its lock (which SQLite refuses under contention).
+    for inventory_id in sorted(quantities):
+        change = quantities[inventory_id]
+        rows = PlantInventory.objects.filter(pk=inventory_id)
+        if change < 0:
+            rows = rows.filter(quantity__gte=-change)
+        if not rows.update(quantity=F('quantity') + change, updated_at=now):
+            return inventory_id
+        # Summary rows take the same relative update, which unlike a
+        # rebuild stays correct under concurrent reservations
+        PlantAvailability.objects.filter(plant__plantinventory=inventory_id).update(
+            total_quantity=F('total_quantity') + change, updated_at=now
+        )
+    bump_version_on_commit(PlantInventory)
+    return None
+
+
+def reserve(items, user=None, ttl=None):
+    """Reserve ``(inventory_id, quantity)`` pairs, all or nothing.
+
+    Raises InsufficientStock, leaving stock untouched, if any row is short.
+    """
+    quantities = {}
+    for inventory_id, quantity in items:
+        quantities[inventory_id] = quantities.get(inventory_id, 0) + quantity
+    release_expired(inventory_ids=list(quantities))
+
+    expires_at = timezone.now() + (ttl or get_reservation_ttl())
+    with transaction.atomic():
+        short = adjust_stock({pk: -quantity for pk, quantity in quantities.items()})
+        if short is not None:
+            raise InsufficientStock(short, quantities[short])
+        return StockReservation.objects.bulk_create([
+            StockReservation(inventory_id=inventory_id, quantity=quantity,
+                             reserved_by=user, expires_at=expires_at)
+            for inventory_id, quantity in items
+        ])
+
+
+def release(reservations):
+    """Return the stock of held ``reservations``; returns the ones released.
+
+    The status check in the UPDATE means a reservation released by its owner
+    and by the expiry sweep at the same moment only gives its stock back once.
+    """
+    released = []
+    with transaction.atomic():
+        for reservation in sorted(reservations, key=lambda r: r.pk):
+            if StockReservation.objects.filter(pk=reservation.pk, status='held').update(
+                status='released', updated_at=timezone.now()
+            ):
+                released.append(reservation)
+        quantities = {}
+        for reservation in released:
+            quantities[reservation.inventory_id] = (
+                quantities.get(reservation.inventory_id, 0) + reservation.quantity
+            )
+        if quantities:
+            adjust_stock(quantities)
+    return released
+
+
+def confirm(reservation):
+    """Turn a held, unexpired reservation into a sale; returns False otherwise"""
+    now = timezone.now()
+    return bool(StockReservation.objects.filter(
+        pk=reservation.pk, status='held', expires_at__gt=now
+    ).update(status='confirmed', updated_at=now))
+
+
+def release_expired(inventory_ids=None):
+    """Release held reservations past their expiry, optionally only on some rows"""
+    expired = StockReservation.objects.filter(status='held', expires_at__lte=timezone.now())
+    if inventory_ids is not None:
+        expired = expired.filter(inventory_id__in=inventory_ids)
+    expired = list(expired.only('id', 'inventory_id', 'quantity'))
+    if not expired:
+        return []
+    return release(expired)
@@ -0,0 +1,116 @@
+"""Full-text search over plants.
+
+On PostgreSQL plants carry a weighted ``search_vector`` column backed by a GIN
+index, and name lookups fall back to pg_trgm similarity so that typos still
+find something. On SQLite (local development) an FTS5 table mirrors the same
+columns. Any other backend falls back to ``icontains`` on the names.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+from .models import Plant
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'plants_plant_fts'
+
+# Searchable columns with their Postgres weight; names rank above prose.
+SEARCH_FIELDS = (
+    ('common_name', 'A'),
+    ('scientific_name', 'A'),
+    ('native_region', 'B'),
+    ('description', 'C'),
+    ('care_instructions', 'D'),
+)
+# bm25 weights for the FTS5 table, in SEARCH_FIELDS order
+FTS_WEIGHTS = (10.0, 10.0, 4.0, 2.0, 1.0)
+
+
+def plant_search_vector():
+    vector = None
+    for field, weight in SEARCH_FIELDS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def update_search_index(plant_ids):
+    """Refresh the search index for the given plants in one or two queries"""
+    plant_ids = list(plant_ids)
+    if not plant_ids:
+        return
+    if connection.vendor == 'postgresql':
+        Plant.objects.filter(pk__in=plant_ids).update(search_vector=plant_search_vector())
+    elif connection.vendor == 'sqlite':
+        columns = ', '.join(field for field, _ in SEARCH_FIELDS)
+        placeholders = ', '.join(['%s'] * len(plant_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", plant_ids
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {columns}) "
+                f"SELECT id, {columns} FROM plants_plant WHERE id IN ({placeholders})",
+                plant_ids,
+            )
+
+
+def remove_from_search_index(plant_ids):
+    """Drop deleted plants from the SQLite index; Postgres rows go with the plant"""
+    plant_ids = list(plant_ids)
+    if plant_ids and connection.vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(plant_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", plant_ids
+            )
+
+
+def search_plants(queryset, text):
+    """Filter ``queryset`` to plants matching ``text``, best matches first"""
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        # Every term must match, and the last one may be a prefix of a word
+        # so results appear while the user is still typing.
+        raw = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        query = SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), query),
+            similarity=Greatest(
+                TrigramSimilarity('common_name', text),
+                TrigramSimilarity('scientific_name', text),
+            ),
+        ).filter(
+            Q(search_vector=query) |
+            Q(common_name__trigram_similar=text) |
+            Q(scientific_name__trigram_similar=text)
+        ).order_by('-rank', '-similarity', 'common_name', 'id')
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        ).annotate(
+            rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = plants_plant.id",
+                [match],
+            )
+        ).order_by('-rank', 'common_name', 'id')
+
+    return queryset.filter(
+        Q(common_name__icontains=text) |
+        Q(scientific_name__icontains=text)
+    )
@@ -1,13 +1,69 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Plant, PlantImage, PlantInventory
+from .models import Plant, PlantImage, PlantInventory, ImportJob, StockReservation
+from .availability import annotate_availability
+from .renditions import FORMATS, rendition_urls
+from .instrumentation import SerializerTimingMixin
+
+# Formats annotated prices the same way model DecimalFields are rendered
+PRICE_FIELD = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+def get_distance(obj):
+    """Kilometres from a ``?near=`` point, when the query annotated one"""
+    distance = getattr(obj, 'distance', None)
+    return round(distance, 2) if distance is not None else None
+
+class SparseFieldsetMixin:
+    """Accepts ``fields``/``omit`` keyword arguments that trim the declared fields"""
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - {'id'}:
+                self.fields.pop(name)
+        for name in omit or ():
+            if name != 'id':
+                self.fields.pop(name, None)
+
+    def get_model_columns(self):
+        """Names of the concrete model columns the remaining fields read"""
+        opts = self.Meta.model._meta
+        columns = ['id']
+        for field in self.fields.values():
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.append(model_field.name)
+        return columns
+
+class RenditionsField(serializers.ReadOnlyField):
+    """URLs of an image's resized copies, by size then format"""
+
+    def to_representation(self, value):
+        urls = rendition_urls(value or {})
+        request = self.context.get('request')
+        if request is not None:
+            # Absolute, like DRF renders the original image URL
+            for entry in urls.values():
+                for fmt in FORMATS:
+                    entry[fmt] = request.build_absolute_uri(entry[fmt])
+        return urls
 
 class PlantImageSerializer(serializers.ModelSerializer):
+    renditions = RenditionsField()
+
     class Meta:
         model = PlantImage
-        fields = ['id', 'image', 'caption']
+        fields = ['id', 'image', 'renditions', 'caption']
 
-class PlantSerializer(serializers.ModelSerializer):
+class PlantSerializer(SerializerTimingMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    main_image_renditions = RenditionsField()
     additional_images = PlantImageSerializer(many=True, read_only=True)
+    availability = serializers.SerializerMethodField()
+    distance = serializers.SerializerMethodField()
     
     class Meta:
         model = Plant
@@ -20,20 +76,157 @@ class PlantSerializer(serializers.ModelSerializer):
             'flowering_season', 'flowering_color', 'fruiting_season', 'fragrant',
             'hardiness_zone', 'native_region', 'drought_tolerant', 'deer_resistant',
             'pest_resistant', 'edible', 'indoor_suitable', 'main_image',
-            'additional_images', 'created_at', 'updated_at'
+            'main_image_renditions', 'additional_images', 'availability', 'distance', 'created_at', 'updated_at'
         ]
 
-class PlantInventorySerializer(serializers.ModelSerializer):
-    plant = PlantSerializer(read_only=True)
+    def get_availability(self, obj):
+        """Stock across nurseries, read from annotate_availability()"""
+        if not hasattr(obj, 'total_quantity'):
+            return None
+        return {
+            'quantity': obj.total_quantity or 0,
+            'min_price': PRICE_FIELD.to_representation(obj.min_price)
+            if obj.min_price is not None else None,
+            'max_price': PRICE_FIELD.to_representation(obj.max_price)
+            if obj.max_price is not None else None,
+            'nursery_count': obj.nursery_count or 0,
+        }
+
+    def get_distance(self, obj):
+        return get_distance(obj)
+
+    @staticmethod
+    def setup_eager_loading(queryset, prefix='', serializer=None):
+        """Load everything the serializer reads in a constant number of queries
+
+        Given a trimmed ``serializer``, only the columns its fields read are
+        selected (plus the pagination keys) and images are only prefetched
+        when requested.
+        """
+        if serializer is not None:
+            columns = set(serializer.get_model_columns()) | {'common_name', 'updated_at'}
+            queryset = queryset.only(*columns)
+            if 'availability' in serializer.fields:
+                queryset = annotate_availability(queryset)
+            if 'additional_images' not in serializer.fields:
+                return queryset
+        else:
+            queryset = queryset.defer(f'{prefix}search_vector')
+        return queryset.prefetch_related(
+            Prefetch(
+                f'{prefix}additional_images',
+                queryset=PlantImage.objects.only('id', 'image', 'renditions', 'caption'),
+            )
+        )
+
+class PlantSummarySerializer(PlantSerializer):
+    """Compact default representation for plant list pages"""
+
+    class Meta(PlantSerializer.Meta):
+        fields = [
+            'id', 'common_name', 'scientific_name', 'light_requirement',
+            'water_requirement', 'indoor_suitable', 'main_image',
+            'main_image_renditions', 'availability', 'distance'
+        ]
+
+class PlantInventorySerializer(SerializerTimingMixin, serializers.ModelSerializer):
+    plant = PlantSerializer(read_only=True, omit=['availability', 'distance'])
     plant_id = serializers.PrimaryKeyRelatedField(
         queryset=Plant.objects.all(), 
         write_only=True,
         source='plant'
     )
+    distance = serializers.SerializerMethodField()
     
     class Meta:
         model = PlantInventory
         fields = [
             'id', 'plant', 'plant_id', 'quantity', 'price', 'size',
-            'notes', 'seasonal_availability', 'created_at', 'updated_at'
+            'notes', 'seasonal_availability', 'distance', 'created_at', 'updated_at'
+        ]
+
+    def get_distance(self, obj):
+        return get_distance(obj)
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        queryset = queryset.select_related('plant')
+        return PlantSerializer.setup_eager_loading(queryset, prefix='plant__')
+
+class PlantImportSerializer(PlantSerializer):
+    """Validates CSV rows; uploads carry no image and may leave text blank"""
+
+    class Meta(PlantSerializer.Meta):
+        fields = [
+            field for field in PlantSerializer.Meta.fields
+            if field not in ('id', 'main_image_renditions', 'additional_images',
+                             'availability', 'distance', 'created_at', 'updated_at')
+        ] + ['price', 'quantity']
+        extra_kwargs = {
+            'main_image': {'required': False},
+            'care_instructions': {'allow_blank': True},
+            'planting_instructions': {'allow_blank': True},
+            'soil_type': {'allow_blank': True},
+            'fertilizer_requirements': {'allow_blank': True},
+            'time_to_maturity': {'allow_blank': True},
+            'hardiness_zone': {'allow_blank': True},
+            'native_region': {'allow_blank': True},
+        }
+
+class InventorySyncRowSerializer(serializers.ModelSerializer):
+    """Validates one row of a bulk stock sync, keyed by (plant_id, size)"""
+    plant_id = serializers.IntegerField()
+
+    class Meta:
+        model = PlantInventory
+        fields = ['plant_id', 'size', 'quantity', 'price', 'notes', 'seasonal_availability']
+        # A sync may send only what changed; new rows are checked separately
+        extra_kwargs = {
+            'quantity': {'required': False},
+            'price': {'required': False},
+        }
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    duration = serializers.FloatField(read_only=True)
+    throughput = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'file', 'mode', 'key', 'status', 'rows_processed',
+            'rows_created', 'rows_updated', 'rows_unchanged', 'error_count',
+            'errors', 'chunks_done', 'message', 'duration', 'throughput',
+            'started_at', 'finished_at', 'created_at'
+        ]
+        read_only_fields = [
+            'status', 'rows_processed', 'rows_created', 'rows_updated',
+            'rows_unchanged', 'error_count', 'errors', 'chunks_done',
+            'message', 'started_at', 'finished_at'
         ]
+        extra_kwargs = {'file': {'write_only': True}}
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'inventory', 'quantity', 'status', 'expires_at', 'created_at']
+        read_only_fields = fields
+
+class ReservationQuantitySerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+class ReservationItemSerializer(ReservationQuantitySerializer):
+    inventory_id = serializers.IntegerField()
+
+class ReservationBatchSerializer(serializers.Serializer):
+    MAX_ITEMS = 100
+
+    items = ReservationItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+
+    def validate_items(self, items):
+        ids = {item['inventory_id'] for item in items}
+        missing = ids - set(PlantInventory.objects.filter(pk__in=ids).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown inventory: {', '.join(str(pk) for pk in sorted(missing))}"
+            )
+        return items
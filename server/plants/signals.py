@@ -0,0 +1,74 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .availability import refresh_availability
+from .cache import bump_version_on_commit
+from .changes import record_deletion
+from .renditions import enqueue_renditions, needs_renditions
+from .models import Plant, PlantImage, PlantInventory, NurseryProfile, SimilarPlant
+from .search import update_search_index, remove_from_search_index
+from .similarity import FEATURE_COLUMNS, enqueue_similar_refresh
+
+
+@receiver(post_save, sender=Plant)
+def index_plant(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_search_index([instance.pk])
+
+
+@receiver(post_save, sender=Plant)
+@receiver(post_save, sender=PlantImage)
+def render_image(sender, instance, raw=False, **kwargs):
+    if not raw and needs_renditions(instance):
+        enqueue_renditions(instance)
+
+
+@receiver(post_save, sender=Plant)
+def refresh_similar_plants(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not set(update_fields) & set(FEATURE_COLUMNS)):
+        return
+    enqueue_similar_refresh([instance.pk])
+
+
+@receiver(pre_delete, sender=Plant)
+def refresh_plants_similar_to(sender, instance, **kwargs):
+    # Their rows pointing at this plant are about to cascade away
+    enqueue_similar_refresh(
+        SimilarPlant.objects.filter(similar=instance).values_list('plant_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Plant)
+def unindex_plant(sender, instance, **kwargs):
+    remove_from_search_index([instance.pk])
+
+
+@receiver(post_delete, sender=Plant)
+@receiver(post_delete, sender=PlantInventory)
+def add_tombstone(sender, instance, **kwargs):
+    record_deletion(sender, instance.pk)
+
+
+@receiver(post_save, sender=PlantInventory)
+@receiver(post_delete, sender=PlantInventory)
+def refresh_plant_availability(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_availability([instance.plant_id])
+
+
+@receiver(post_save, sender=Plant)
+@receiver(post_delete, sender=Plant)
+@receiver(post_save, sender=PlantImage)
+@receiver(post_delete, sender=PlantImage)
+@receiver(post_save, sender=PlantInventory)
+@receiver(post_delete, sender=PlantInventory)
+@receiver(post_save, sender=NurseryProfile)
+@receiver(post_delete, sender=NurseryProfile)
+def invalidate_cached_responses(sender, **kwargs):
+    bump_version_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=Plant.additional_images.through)
+def invalidate_plant_images(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version_on_commit(Plant)
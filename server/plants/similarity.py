@@ -0,0 +1,279 @@
+"""Precomputed "similar plants" recommendations.
+
+Two plants are candidates for each other when they share light and water
+needs and their temperature ranges overlap. Candidates are ranked by the
+weighted distance between feature vectors built from the temperature
+range, coldest hardiness zone, growth rate, humidity, height and the boolean
+traits (see ``WEIGHTS``). The ``PLANTS_SIMILAR_COUNT`` nearest are stored
+in SimilarPlant, so ``/api/plants/<id>/similar/`` is a single indexed
+lookup.
+
+Distances are computed with NumPy, one block of plants against the rest of
+its (light, water) group at a time. ``refresh_similar`` recomputes the
+neighbour lists of changed plants, and of every plant a change can add
+itself to or drop out of, in the background after the change commits (see
+``enqueue_similar_refresh``). ``rebuild_similar`` (management command
+``refresh_similar``) recomputes every list.
+"""
+import logging
+import math
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .cache import bump_version
+from .executors import get_executor
+from .models import Plant, SimilarPlant
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILAR_COUNT = 10
+# Plants compared against their whole group at once; bounds memory at
+# BLOCK_SIZE x group size distances
+BLOCK_SIZE = 512
+# A refresh of more than this share of the catalog rebuilds everything
+REBUILD_FRACTION = 0.2
+
+# Stands in for a hardiness zone that couldn't be read, in the middle of
+# the 1-13 scale; fixed so that no plant's features depend on other plants
+DEFAULT_ZONE = 7
+GROWTH_RATES = {'slow': 0.0, 'medium': 0.5, 'fast': 1.0}
+BOOLEAN_TRAITS = (
+    'indoor_suitable', 'drought_tolerant', 'deer_resistant', 'pest_resistant',
+    'edible', 'fragrant',
+)
+# Feature -> weight in the squared distance; every feature is scaled to
+# about [0, 1] first
+WEIGHTS = {
+    'temperature_min': 1.0,
+    'temperature_max': 1.0,
+    'hardiness_zone': 1.0,
+    'growth_rate': 0.5,
+    'humidity_requirement': 0.25,
+    'mature_height': 0.25,
+    **{trait: 0.5 for trait in BOOLEAN_TRAITS},
+}
+FEATURE_COLUMNS = (
+    'id', 'light_requirement', 'water_requirement', 'temperature_min',
+    'temperature_max', 'hardiness_zone_min', 'growth_rate', 'humidity_requirement',
+    'mature_height', *BOOLEAN_TRAITS,
+)
+# Added per unit of id to break ties between equally distant plants in
+# favour of the older one, so a list comes out the same whichever other
+# plants are in its group or recomputed alongside it
+TIE_BREAK = 1e-12
+# Postgres advisory lock held while neighbour lists are recomputed
+LOCK_KEY = 0x73696d696c6172  # "similar"
+
+
+def similar_count():
+    return getattr(settings, 'PLANTS_SIMILAR_COUNT', DEFAULT_SIMILAR_COUNT)
+
+
+class PlantGroup:
+    """Feature vectors of the plants sharing one light and water need, by id"""
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: row['id'])
+        self.ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        self.position = {plant_id: i for i, plant_id in enumerate(self.ids.tolist())}
+        self.t_min = np.array([row['temperature_min'] for row in rows])
+        self.t_max = np.array([row['temperature_max'] for row in rows])
+
+        columns = {
+            'temperature_min': (self.t_min + 20) / 70,
+            'temperature_max': (self.t_max + 20) / 70,
+            'hardiness_zone': np.array([
+                DEFAULT_ZONE if row['hardiness_zone_min'] is None else row['hardiness_zone_min']
+                for row in rows
+            ]) / 13,
+            'growth_rate': np.array([GROWTH_RATES.get(row['growth_rate'], 0.5) for row in rows]),
+            'humidity_requirement': np.array([row['humidity_requirement'] for row in rows]) / 100,
+            'mature_height': np.log1p(np.array([float(row['mature_height']) for row in rows])) / math.log1p(1000),
+            **{trait: np.array([row[trait] for row in rows], dtype=float) for trait in BOOLEAN_TRAITS},
+        }
+        self.vectors = np.column_stack([
+            columns[feature] * math.sqrt(weight) for feature, weight in WEIGHTS.items()
+        ])
+        self.norms = (self.vectors ** 2).sum(axis=1)
+        self.tie_break = self.ids * TIE_BREAK
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distances(self, positions):
+        """Squared distances from the plants at ``positions`` to the whole group.
+
+        Plants that aren't candidates for each other (no temperature
+        overlap, or the plant itself) are infinitely far apart.
+        """
+        distances = (
+            self.norms[positions, None] + self.norms[None, :]
+            - 2 * self.vectors[positions] @ self.vectors.T
+        )
+        np.maximum(distances, 0, out=distances)
+        overlap = (
+            (self.t_min[positions, None] <= self.t_max[None, :]) &
+            (self.t_min[None, :] <= self.t_max[positions, None])
+        )
+        distances[~overlap] = np.inf
+        distances[np.arange(len(positions)), positions] = np.inf
+        return distances
+
+    def neighbours(self, positions, count):
+        """Yield (plant id, [(similar id, distance)]) nearest first"""
+        count = min(count, len(self) - 1)
+        for start in range(0, len(positions), BLOCK_SIZE):
+            block = positions[start:start + BLOCK_SIZE]
+            distances = self.distances(block)
+            if count <= 0:
+                yield from ((int(self.ids[position]), []) for position in block)
+                continue
+            ranked = distances + self.tie_break
+            nearest = np.argpartition(ranked, count - 1, axis=1)[:, :count]
+            order = np.argsort(np.take_along_axis(ranked, nearest, axis=1), axis=1)
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            for row, position in enumerate(block):
+                yield int(self.ids[position]), [
+                    (int(self.ids[other]), float(distances[row, other]))
+                    for other in nearest[row] if np.isfinite(distances[row, other])
+                ]
+
+
+def load_groups(plants=None):
+    """PlantGroups of every plant, by (light, water) need"""
+    plants = Plant.objects.all() if plants is None else plants
+    by_need = defaultdict(list)
+    for row in plants.order_by().values(*FEATURE_COLUMNS):
+        by_need[row['light_requirement'], row['water_requirement']].append(row)
+    return [PlantGroup(group) for group in by_need.values()]
+
+
+@contextmanager
+def similarity_lock():
+    """Run the block in a transaction no other process's refresh overlaps.
+
+    Refreshes queue up one at a time within a process (see
+    ``enqueue_similar_refresh``) but every worker process has its own
+    queue, and two refreshes rewriting overlapping lists at once would
+    race on (plant, rank). On Postgres an advisory lock orders them; SQLite
+    already lets only one transaction write at a time.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LOCK_KEY])
+        yield
+
+
+def write_neighbours(neighbours, plant_ids=None, batch_size=1000):
+    """Replace the lists of ``plant_ids`` (all if None) with ``neighbours``"""
+    rows = SimilarPlant.objects.all()
+    if plant_ids is not None:
+        rows = rows.filter(plant_id__in=plant_ids)
+    with transaction.atomic():
+        rows.delete()
+        SimilarPlant.objects.bulk_create(
+            (
+                SimilarPlant(plant_id=plant_id, similar_id=similar_id, rank=rank, distance=distance)
+                for plant_id, similar in neighbours
+                for rank, (similar_id, distance) in enumerate(similar, 1)
+            ),
+            batch_size=batch_size,
+        )
+
+
+def rebuild_similar():
+    """Recompute every plant's neighbours"""
+    count = similar_count()
+    neighbours = []
+    with similarity_lock():
+        for group in load_groups():
+            neighbours.extend(group.neighbours(np.arange(len(group)), count))
+        write_neighbours(neighbours)
+    return len(neighbours)
+
+
+def refresh_similar(plant_ids):
+    """Recompute the neighbours of changed (or deleted) plants.
+
+    Besides the changed plants themselves, that is every plant that listed
+    one of them and every plant one of them is now at least as close to as
+    its current last neighbour.
+    """
+    changed = set(plant_ids)
+    if not changed:
+        return 0
+    # Read the lists being updated only once no other refresh can change them
+    with similarity_lock():
+        return refresh_lists(changed)
+
+
+def refresh_lists(changed):
+    """``refresh_similar`` for a non-empty set of ids, under the similarity lock"""
+    groups = load_groups()
+    total = sum(len(group) for group in groups)
+    if len(changed) > REBUILD_FRACTION * total:
+        return rebuild_similar()
+
+    count = similar_count()
+    affected = changed | set(
+        SimilarPlant.objects.filter(similar_id__in=changed).values_list('plant_id', flat=True)
+    )
+    # Distance to the last neighbour of every plant with a full list; a
+    # plant with a shorter list takes any candidate it isn't infinitely far from
+    furthest = dict(
+        SimilarPlant.objects.filter(rank=count).values_list('plant_id', 'distance')
+    )
+    neighbours = []
+    for group in groups:
+        positions = np.array([group.position[pk] for pk in changed if pk in group.position], dtype=int)
+        if len(positions):
+            limits = np.array([furthest.get(pk, np.inf) for pk in group.ids.tolist()])
+            closest = group.distances(positions).min(axis=0)
+            affected.update(group.ids[np.isfinite(closest) & (closest <= limits)].tolist())
+        recompute = np.array([group.position[pk] for pk in affected if pk in group.position], dtype=int)
+        neighbours.extend(group.neighbours(recompute, count))
+    write_neighbours(neighbours, plant_ids=affected)
+    return len(neighbours)
+
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def enqueue_similar_refresh(plant_ids):
+    """Refresh neighbours after the current transaction commits.
+
+    Refreshes run one at a time in the background; ids queued while one
+    runs are merged into the next.
+    """
+    plant_ids = set(plant_ids)
+    if plant_ids:
+        transaction.on_commit(lambda: schedule_refresh(plant_ids))
+
+
+def schedule_refresh(plant_ids):
+    with _pending_lock:
+        idle = not _pending
+        _pending.update(plant_ids)
+    if idle:
+        get_executor('similarity').submit(run_similar_refresh)
+
+
+def run_similar_refresh():
+    close_old_connections()
+    try:
+        with _pending_lock:
+            plant_ids = set(_pending)
+            _pending.clear()
+        refresh_similar(plant_ids)
+        bump_version(SimilarPlant)
+    except Exception:
+        logger.exception("Refreshing similar plants failed")
+    finally:
+        close_old_connections()
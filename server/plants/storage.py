@@ -0,0 +1,116 @@
+"""Content-addressed storage for plant photos.
+
+Uploads are stored under BLOB_PREFIX with a name derived from the SHA-256
+of their bytes, so a stock photo uploaded by a dozen nurseries is kept
+once. The hash is computed while the upload is copied to a temporary file
+beside its destination, which is then renamed into place: every upload is
+read once, and concurrent uploads of the same bytes can't clobber each
+other. ImageBlob rows count the image fields pointing at each file, and
+``delete()`` (which django_cleanup calls when a field changes or its row
+goes) only removes the file, and its renditions, along with the last
+reference. A name always means the same bytes, so blobs are served as
+immutable.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+BLOB_PREFIX = 'plants/blobs/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def blob_name(digest, extension):
+    # Two levels of fan-out keep directories small
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def add_reference(name, size):
+    ImageBlob = apps.get_model('plants', 'ImageBlob')
+    if ImageBlob.objects.filter(name=name).update(references=F('references') + 1):
+        return
+    try:
+        with transaction.atomic():
+            ImageBlob.objects.create(name=name, size=size)
+    except IntegrityError:
+        # Another upload of the same bytes created the row first
+        ImageBlob.objects.filter(name=name).update(references=F('references') + 1)
+
+
+def drop_reference(name):
+    """Release one reference to ``name``; True once nothing refers to it.
+
+    A blob without a row (stored before reference counting, or whose row
+    went missing) is never reported unreferenced: other fields may still
+    point at it. ``dedupe_media`` recounts those.
+    """
+    ImageBlob = apps.get_model('plants', 'ImageBlob')
+    if ImageBlob.objects.filter(name=name, references__gt=1).update(references=F('references') - 1):
+        return False
+    deleted, _ = ImageBlob.objects.filter(name=name).delete()
+    return bool(deleted)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files by their content"""
+
+    def get_available_name(self, name, max_length=None):
+        # _save replaces the name with the content hash, which never collides
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(BLOB_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+            name = blob_name(digest.hexdigest(), posixpath.splitext(name)[1].lower())
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, self.file_permissions_mode or 0o644)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        add_reference(name, size)
+        return name
+
+    def delete(self, name):
+        if name and name.startswith(BLOB_PREFIX):
+            if drop_reference(name):
+                self.remove(name)
+            return
+        super().delete(name)
+
+    def remove(self, name):
+        """Delete a blob and its renditions, whatever still refers to them"""
+        # Renditions are shared by every row showing the blob (see
+        # renditions.find_renditions), so they go with its last reference
+        from .renditions import delete_renditions
+        super().delete(name)
+        delete_renditions(name)
+
+
+def image_storage():
+    return ContentAddressedStorage()
+
+
+def import_storage():
+    """Uploads queued for background import, kept out of the served media"""
+    return FileSystemStorage(location=settings.PLANTS_IMPORT_UPLOAD_ROOT)
@@ -0,0 +1,213 @@
+"""Synthetic catalogs for load testing.
+
+``generate_catalog`` bulk-inserts plants, nurseries (users with a
+NurseryProfile), inventory and photos with plausible, seeded-random values,
+so that benchmarks run against realistic table sizes and value
+distributions. Everything it creates is owned by SYNTHETIC_USER or by users
+named with SYNTHETIC_NURSERY_PREFIX, which is what ``clear_catalog``
+deletes.
+"""
+import io
+import random
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from PIL import Image
+
+from .availability import refresh_availability
+from .cache import bump_version_on_commit
+from .importers import row_to_plant_data
+from .models import ImageBlob, NurseryProfile, Plant, PlantImage, PlantInventory
+from .search import update_search_index
+from .similarity import enqueue_similar_refresh
+from .storage import image_storage
+
+SYNTHETIC_USER = 'synthetic-catalog'
+SYNTHETIC_NURSERY_PREFIX = 'synthetic-nursery-'
+
+GENERA = (
+    'Acer', 'Agave', 'Allium', 'Aloe', 'Alocasia', 'Anemone', 'Aster', 'Begonia',
+    'Buxus', 'Calathea', 'Camellia', 'Clematis', 'Cornus', 'Dahlia', 'Dracaena',
+    'Echinacea', 'Euphorbia', 'Ficus', 'Fuchsia', 'Geranium', 'Hebe', 'Hedera',
+    'Helleborus', 'Hosta', 'Hydrangea', 'Ilex', 'Iris', 'Jasminum', 'Lavandula',
+    'Magnolia', 'Monstera', 'Nepeta', 'Paeonia', 'Philodendron', 'Pieris', 'Pinus',
+    'Primula', 'Prunus', 'Rosa', 'Rosmarinus', 'Salvia', 'Sedum', 'Skimmia',
+    'Spiraea', 'Thymus', 'Viburnum', 'Viola', 'Wisteria', 'Yucca', 'Zamioculcas',
+)
+EPITHETS = (
+    'alba', 'aurea', 'compacta', 'elegans', 'gigantea', 'grandiflora', 'japonica',
+    'latifolia', 'macrophylla', 'minor', 'nana', 'nigra', 'officinalis', 'pendula',
+    'purpurea', 'repens', 'rubra', 'sempervirens', 'sylvestris', 'tomentosa', 'variegata',
+    'vulgaris',
+)
+CULTIVARS = (
+    'Amethyst', 'Autumn Glow', 'Blue Haze', 'Crimson King', 'Dwarf', 'Emerald Gem',
+    'Frosty', 'Golden Queen', 'Ivory Lace', 'Midnight', 'Pink Cloud', 'Silver Lining',
+    'Snow White', 'Sunset', 'Velvet',
+)
+ADJECTIVES = (
+    'Creeping', 'Dwarf', 'Giant', 'Golden', 'Japanese', 'Mountain', 'Scarlet', 'Silver',
+    'Sweet', 'Weeping', 'White', 'Winter',
+)
+NOUNS = (
+    'Bellflower', 'Fern', 'Holly', 'Ivy', 'Laurel', 'Lily', 'Maple', 'Palm', 'Pine',
+    'Rose', 'Sage', 'Star', 'Thyme', 'Violet',
+)
+PROSE = (
+    'Hardy and reliable', 'Thrives in containers', 'Attracts pollinators',
+    'Glossy evergreen foliage', 'Long flowering season', 'Tolerates clay soil',
+    'Ideal for borders', 'Scented blooms in the evening', 'Low maintenance',
+    'Striking autumn colour', 'Good ground cover', 'Suits coastal gardens',
+)
+SIZES = ('9cm pot', '1 litre', '2 litre', '3 litre', '5 litre', '10 litre', '20 litre')
+SEASONS = ('spring', 'summer', 'autumn', 'winter', '')
+
+
+def synthetic_plant_rows(count, rng=None, start=0):
+    """Yield ``count`` CSV-style plant rows with plausible values"""
+    rng = rng or random.Random(0)
+    for i in range(start, start + count):
+        genus = rng.choice(GENERA)
+        scientific = f"{genus} {rng.choice(EPITHETS)} '{rng.choice(CULTIVARS)}' {i}"
+        temperature_min = rng.randint(-20, 15)
+        yield {
+            'common_name': f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+            'scientific_name': scientific,
+            'description': '. '.join(rng.sample(PROSE, 3)) + '.',
+            'care_instructions': rng.choice(PROSE),
+            'light_requirement': rng.choice(('low', 'medium', 'high')),
+            'water_requirement': rng.choice(('low', 'medium', 'high')),
+            'temperature_min': temperature_min,
+            'temperature_max': rng.randint(max(temperature_min + 5, 20), 45),
+            'humidity_requirement': rng.randint(20, 90),
+            'mature_height': rng.randint(5, 900),
+            'mature_spread': rng.randint(5, 600),
+            'growth_rate': rng.choice(('slow', 'medium', 'fast')),
+            'hardiness_zone': f'H{rng.randint(1, 7)}',
+            'native_region': rng.choice(('Europe', 'East Asia', 'North America', 'South Africa',
+                                         'Mediterranean', 'South America')),
+            'indoor_suitable': rng.random() < 0.25,
+            'drought_tolerant': rng.random() < 0.2,
+            'deer_resistant': rng.random() < 0.15,
+            'edible': rng.random() < 0.05,
+            'pest_resistant': rng.random() < 0.3,
+            'price': round(rng.uniform(2, 120), 2),
+            'quantity': rng.randint(0, 200),
+        }
+
+
+def synthetic_photos(count, rng):
+    """Small distinct JPEGs; the catalog reuses them like real stock photos"""
+    photos = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        colour = tuple(rng.randint(0, 255) for _ in range(3))
+        Image.new('RGB', (640, 480), colour).save(buffer, 'JPEG', quality=80)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def generate_catalog(plants=1000, nurseries=50, inventory=5000, photos=20,
+                     additional_images=2, seed=0, batch_size=1000, log=None):
+    """Bulk-insert a synthetic catalog and return how many rows of each kind were made"""
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    owner, _ = User.objects.get_or_create(username=SYNTHETIC_USER)
+    start = Plant.objects.filter(created_by=owner).count()
+
+    with transaction.atomic():
+        storage = image_storage()
+        photo_names = [
+            storage.save('plants/main/synthetic.jpg', ContentFile(data))
+            for data in synthetic_photos(photos, rng)
+        ]
+        log(f'{len(photo_names)} photos')
+
+        created_plants = []
+        for row in synthetic_plant_rows(plants, rng, start=start):
+            plant = Plant(**row_to_plant_data(row), created_by=owner, flowering_season=rng.choice(SEASONS))
+            if photo_names:
+                plant.main_image = rng.choice(photo_names)
+            plant.fill_hardiness_zone()
+            created_plants.append(plant)
+        created_plants = Plant.objects.bulk_create(created_plants, batch_size=batch_size)
+        update_search_index(plant.pk for plant in created_plants)
+        enqueue_similar_refresh(plant.pk for plant in created_plants)
+        log(f'{len(created_plants)} plants')
+
+        gallery = []
+        if photo_names and additional_images:
+            images = PlantImage.objects.bulk_create(
+                [PlantImage(image=name, caption='Synthetic photo') for name in photo_names],
+                batch_size=batch_size,
+            )
+            Through = Plant.additional_images.through
+            gallery = Through.objects.bulk_create([
+                Through(plant_id=plant.pk, plantimage_id=image.pk)
+                for plant in created_plants
+                for image in rng.sample(images, min(additional_images, len(images)))
+            ], batch_size=batch_size)
+        log(f'{len(gallery)} gallery links')
+
+        # storage.save counted one reference per photo, which the gallery
+        # image holds; bulk_create counted none for the plants
+        references = Counter(plant.main_image.name for plant in created_plants if plant.main_image)
+        if not gallery:
+            references.subtract(photo_names)
+        for name, count in references.items():
+            if count > 0:
+                ImageBlob.objects.filter(name=name).update(references=F('references') + count)
+
+        first_nursery = User.objects.filter(username__startswith=SYNTHETIC_NURSERY_PREFIX).count()
+        users = User.objects.bulk_create([
+            User(username=f'{SYNTHETIC_NURSERY_PREFIX}{first_nursery + i}')
+            for i in range(nurseries)
+        ], batch_size=batch_size)
+        users = list(User.objects.filter(
+            username__in=[user.username for user in users]
+        ).order_by('id'))
+        NurseryProfile.objects.bulk_create([
+            NurseryProfile(nursery=user, name=f'Synthetic Nursery {user.pk}',
+                           latitude=rng.uniform(50.0, 58.5), longitude=rng.uniform(-5.5, 1.7),
+                           service_radius=rng.choice((10, 25, 50)))
+            for user in users
+        ], batch_size=batch_size)
+        log(f'{len(users)} nurseries')
+
+        stock, seen = [], set()
+        plant_ids = [plant.pk for plant in created_plants]
+        while plant_ids and users and len(stock) < inventory:
+            key = (rng.choice(plant_ids), rng.choice(users).pk, rng.choice(SIZES))
+            if key in seen:
+                # Small catalogs run out of (plant, nursery, size) combinations
+                if len(seen) >= len(plant_ids) * len(users) * len(SIZES):
+                    break
+                continue
+            seen.add(key)
+            stock.append(PlantInventory(
+                plant_id=key[0], nursery_id=key[1], size=key[2],
+                quantity=rng.randint(0, 100), price=round(rng.uniform(2, 150), 2),
+            ))
+        PlantInventory.objects.bulk_create(stock, batch_size=batch_size)
+        refresh_availability(plant_ids)
+        log(f'{len(stock)} inventory rows')
+
+        for model in (Plant, PlantImage, PlantInventory, NurseryProfile):
+            bump_version_on_commit(model)
+    return {
+        'plants': len(created_plants),
+        'nurseries': len(users),
+        'inventory': len(stock),
+        'photos': len(photo_names),
+    }
+
+
+def clear_catalog():
+    """Delete everything generate_catalog made"""
+    with transaction.atomic():
+        Plant.objects.filter(created_by__username=SYNTHETIC_USER).delete()
+        PlantImage.objects.filter(caption='Synthetic photo').delete()
+        User.objects.filter(username__startswith=SYNTHETIC_NURSERY_PREFIX).delete()
@@ -0,0 +1,609 @@
+"""Tests for the plants app"""
+import io
+import random
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .attributes import ALL_MONTHS, parse_available_months, parse_hardiness_zone
+from .availability import refresh_availability
+from .changes import encode_cursor
+from .importers import PlantCSVImporter
+from .models import (
+    ImageBlob, Plant, PlantAvailability, PlantImage, PlantInventory, SimilarPlant,
+    StockReservation,
+)
+from .renditions import FORMATS, RENDITIONS, rendition_name
+from .reservations import InsufficientStock, release, reserve
+from .similarity import rebuild_similar, refresh_similar
+from .storage import BLOB_PREFIX, image_storage
+
+PAGE_SIZES = (1, 20, 200)
+
+
+def plant_fields(i, **fields):
+    """Valid Plant field values, numbered by ``i`` so names stay unique"""
+    return {
+        'common_name': f'Plant {i:03}', 'scientific_name': f'Planta {i:03}',
+        'description': 'd', 'care_instructions': 'c', 'planting_instructions': 'p',
+        'light_requirement': 'medium', 'water_requirement': 'medium',
+        'temperature_min': 5, 'temperature_max': 25, 'humidity_requirement': 50,
+        'soil_type': 's', 'fertilizer_requirements': 'f', 'mature_height': 30,
+        'mature_spread': 30, 'growth_rate': 'medium', 'time_to_maturity': 't',
+        'hardiness_zone': '7', 'native_region': 'n', 'price': 1, 'quantity': 1,
+        'main_image': 'plants/p.jpg',
+        **fields,
+    }
+
+
+@override_settings(PLANTS_CACHE_TIMEOUT=0)
+class ListQueryCountTests(TestCase):
+    """List pages take the same number of queries however many rows they hold"""
+
+    @classmethod
+    def setUpTestData(cls):
+        nursery = User.objects.create_user('nursery', password='x')
+        plants = Plant.objects.bulk_create(
+            Plant(**plant_fields(i)) for i in range(max(PAGE_SIZES))
+        )
+        images = PlantImage.objects.bulk_create(
+            PlantImage(image=f'plants/{i}.jpg') for i in range(2 * len(plants))
+        )
+        Through = Plant.additional_images.through
+        Through.objects.bulk_create(
+            Through(plant_id=plant.pk, plantimage_id=image.pk)
+            for i, plant in enumerate(plants)
+            for image in images[2 * i:2 * i + 2]
+        )
+        PlantInventory.objects.bulk_create(
+            PlantInventory(plant=plant, nursery=nursery, quantity=1, price=1, size='S')
+            for plant in plants
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertConstantQueries(self, url, params, expected):
+        for page_size in PAGE_SIZES:
+            with self.subTest(url=url, page_size=page_size):
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url, {**params, 'page_size': page_size})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), page_size)
+
+    # Queries below: the count, the page, then one prefetch of the
+    # additional images when the page shows them
+
+    def test_plant_list(self):
+        self.assertConstantQueries('/api/plants/', {}, 2)
+
+    def test_plant_list_with_images(self):
+        self.assertConstantQueries('/api/plants/', {'fields': 'id,common_name,additional_images'}, 3)
+
+    def test_inventory_list(self):
+        # The plant comes in the page query through select_related
+        self.assertConstantQueries('/api/inventory/', {}, 3)
+
+    @override_settings(PLANTS_FAST_LISTS=True)
+    def test_fast_lists(self):
+        self.assertConstantQueries('/api/plants/', {}, 2)
+        self.assertConstantQueries('/api/inventory/', {}, 3)
+
+
+class ReservationRaceTests(TransactionTestCase):
+    """Concurrent reservations never hand out more stock than there is"""
+
+    STOCK = 25
+    ATTEMPTS = 300
+    # Below Postgres' default connection limit: each thread holds one
+    THREADS = 50
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("Threads can't share an in-memory SQLite database under write load")
+
+    def test_no_oversell(self):
+        nursery = User.objects.create_user('nursery', password='x')
+        # bulk_create skips the signals queueing background work on the plant
+        [plant] = Plant.objects.bulk_create([Plant(**plant_fields(0))])
+        inventory = PlantInventory.objects.create(
+            plant=plant, nursery=nursery, quantity=self.STOCK, price=1, size='S'
+        )
+
+        def attempt(_):
+            try:
+                reserve([(inventory.pk, 1)])
+                return True
+            except InsufficientStock:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            reserved = sum(pool.map(attempt, range(self.ATTEMPTS)))
+
+        inventory.refresh_from_db()
+        self.assertEqual(reserved, self.STOCK)
+        self.assertEqual(reserved + inventory.quantity, self.STOCK)
+        self.assertEqual(
+            StockReservation.objects.filter(inventory=inventory, status='held').count(), reserved
+        )
+        self.assertEqual(PlantAvailability.objects.get(plant=plant).total_quantity, inventory.quantity)
+
+
+class InventorySyncTests(TestCase):
+    """The bulk stock sync writes all rows or none"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.nursery = User.objects.create_user('nursery', password='x')
+        cls.plants = Plant.objects.bulk_create(Plant(**plant_fields(i)) for i in range(2))
+        cls.inventory = PlantInventory.objects.create(
+            plant=cls.plants[0], nursery=cls.nursery, quantity=10, price=5, size='S'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.nursery)
+
+    def sync(self, items):
+        return self.client.post('/api/inventory/bulk/', items, format='json')
+
+    def test_diff(self):
+        response = self.sync([
+            {'plant_id': self.plants[0].pk, 'size': 'S', 'quantity': 7, 'price': '5.00'},
+            {'plant_id': self.plants[1].pk, 'size': 'S', 'quantity': 3, 'price': '2.50'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['created']), (1, 1))
+        updated, created = response.data['changes']
+        self.assertEqual(updated['id'], self.inventory.pk)
+        self.assertEqual(updated['changes'], {'quantity': [10, 7]})
+        self.assertEqual(created['action'], 'created')
+        self.assertEqual(PlantInventory.objects.get(pk=created['id']).quantity, 3)
+        self.assertEqual(PlantAvailability.objects.get(plant=self.plants[1]).total_quantity, 3)
+
+        response = self.sync([{'plant_id': self.plants[0].pk, 'size': 'S', 'quantity': 7}])
+        self.assertEqual((response.data['updated'], response.data['unchanged']), (0, 1))
+
+    def test_invalid_rows_write_nothing(self):
+        response = self.sync([
+            {'plant_id': self.plants[0].pk, 'size': 'S', 'quantity': 1},
+            {'plant_id': self.plants[1].pk, 'size': 'S', 'quantity': -1, 'price': '1'},
+            'not a row',
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 10)
+        self.assertFalse(PlantInventory.objects.filter(plant=self.plants[1]).exists())
+
+    def test_errors_found_while_writing_roll_back(self):
+        response = self.sync([
+            {'plant_id': self.plants[0].pk, 'size': 'S', 'quantity': 1},
+            {'plant_id': self.plants[1].pk, 'size': 'S', 'quantity': 1},  # no price
+            {'plant_id': 999999, 'size': 'S', 'quantity': 1, 'price': '1'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error_count'], 2)
+        self.assertEqual(response.data['changes'], [])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 10)
+
+    def test_quantity_is_stock_on_hand(self):
+        [reservation] = reserve([(self.inventory.pk, 4)])
+        response = self.sync([{'plant_id': self.plants[0].pk, 'size': 'S', 'quantity': 12}])
+        self.assertEqual(response.data['changes'][0]['changes'], {'quantity': [10, 12]})
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 8)
+
+        release([reservation])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 12)
+
+    def test_quantity_below_held_stock(self):
+        reserve([(self.inventory.pk, 4)])
+        response = self.sync([{'plant_id': self.plants[0].pk, 'size': 'S', 'quantity': 3}])
+        self.assertEqual(response.status_code, 400)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 6)
+
+
+class AvailabilityTests(TestCase):
+
+    def test_full_rebuild_in_batches(self):
+        nursery = User.objects.create_user('nursery', password='x')
+        plants = Plant.objects.bulk_create(Plant(**plant_fields(i)) for i in range(5))
+        PlantInventory.objects.bulk_create(
+            PlantInventory(plant=plant, nursery=nursery, quantity=i, price=i + 1, size='S')
+            for i, plant in enumerate(plants[:4])
+        )
+        PlantAvailability.objects.create(plant=plants[4], total_quantity=9)
+
+        refresh_availability(batch_size=2)
+        self.assertEqual(
+            dict(PlantAvailability.objects.values_list('plant_id', 'total_quantity')),
+            {plant.pk: i for i, plant in enumerate(plants[:4])},
+        )
+
+
+class AsyncViewTests(TestCase):
+    """The async endpoints return the same bytes as the viewsets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        nursery = User.objects.create_user('nursery', password='x')
+        plants = Plant.objects.bulk_create(
+            Plant(**plant_fields(i, description='Évergreen , 1.5e-05 “hardy”')) for i in range(3)
+        )
+        PlantInventory.objects.create(plant=plants[0], nursery=nursery, quantity=1, price=1, size='S')
+        cls.plant = plants[0]
+
+    def assertSameBody(self, path):
+        sync = self.client.get(f'/api{path}')
+        async_ = self.client.get(f'/api/async{path}')
+        self.assertEqual(async_.status_code, sync.status_code)
+        self.assertEqual(async_['Content-Type'], sync['Content-Type'])
+        self.assertEqual(async_.content, sync.content)
+
+    def test_same_bytes(self):
+        for path in ('/plants/', '/plants/?search=plant&facets=true',
+                     f'/plants/{self.plant.pk}/', '/plants/999999/', '/inventory/'):
+            with self.subTest(path=path):
+                self.assertSameBody(path)
+
+    @override_settings(PLANTS_CACHE_TIMEOUT=0)
+    def test_same_bytes_uncached(self):
+        self.assertSameBody('/plants/')
+        self.assertSameBody('/inventory/')
+
+
+class UpsertImportTests(TestCase):
+    """Upserts keep falsy values and leave columns a row doesn't give alone"""
+
+    def setUp(self):
+        self.plant = Plant.objects.create(**plant_fields(
+            0, scientific_name='Photinia fraseri', price='12.50', quantity=7, edible=True
+        ))
+
+    def upsert(self, *rows):
+        importer = PlantCSVImporter(mode='upsert')
+        return importer.run_rows(enumerate(rows, 1))
+
+    def test_falsy_values_and_untouched_columns(self):
+        result = self.upsert(
+            {'common_name': 'Red Robin', 'scientific_name': 'Photinia fraseri',
+             'description': 'new', 'temperature_min': '0', 'price': '', 'edible': 'false'},
+            {'common_name': 'New', 'scientific_name': 'Novus', 'description': 'd',
+             'temperature_min': '0', 'quantity': '0'},
+        )
+        self.assertEqual((result['count'], result['updated'], result['error_count']), (1, 1, 0))
+
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.common_name, 'Red Robin')
+        self.assertEqual(self.plant.description, 'new')
+        self.assertEqual(self.plant.temperature_min, 0)
+        self.assertFalse(self.plant.edible)
+        # Empty or missing in the row
+        self.assertEqual(self.plant.price, Decimal('12.50'))
+        self.assertEqual(self.plant.quantity, 7)
+        self.assertEqual(self.plant.temperature_max, 25)
+
+        new = Plant.objects.get(scientific_name='Novus')
+        self.assertEqual((new.temperature_min, new.temperature_max, new.quantity), (0, 30, 0))
+
+    def test_unchanged_rows(self):
+        result = self.upsert({'common_name': 'Plant 000', 'scientific_name': 'Photinia fraseri',
+                              'description': 'd', 'quantity': '7'})
+        self.assertEqual((result['updated'], result['unchanged']), (0, 1))
+
+
+@override_settings(PLANTS_CACHE_TIMEOUT=0, PLANTS_CHANGES_SETTLE_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    """Change feeds page by cursor and report deletions from tombstones"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.start = timezone.now() - timedelta(hours=1)
+        self.plants = Plant.objects.bulk_create(Plant(**plant_fields(i)) for i in range(5))
+        for i, plant in enumerate(self.plants):
+            # Two plants share each timestamp, so pages split ties on id
+            Plant.objects.filter(pk=plant.pk).update(updated_at=self.start + timedelta(minutes=i // 2))
+
+    def changes(self, **params):
+        response = self.client.get('/api/plants/changes/', {'fields': 'id', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def drain(self, cursor=None, **params):
+        changed, deleted = [], []
+        while True:
+            page = self.changes(**({'cursor': cursor} if cursor else {}), **params)
+            changed += [row['id'] for row in page['changed']]
+            deleted += page['deleted']
+            cursor = page['cursor']
+            if not page['has_more']:
+                return changed, deleted, cursor
+
+    def test_full_sync_then_changes(self):
+        changed, deleted, cursor = self.drain(limit=2)
+        self.assertEqual(changed, [plant.pk for plant in self.plants])
+        self.assertEqual(deleted, [])
+
+        self.plants[1].description = 'edited'
+        self.plants[1].save()
+        deleted_id = self.plants[3].pk
+        self.plants[3].delete()
+        changed, deleted, cursor = self.drain(cursor, limit=2)
+        self.assertEqual(changed, [self.plants[1].pk])
+        self.assertEqual(deleted, [deleted_id])
+
+        self.assertEqual(self.drain(cursor)[:2], ([], []))
+
+    def test_updated_since(self):
+        page = self.changes(updated_since=(self.start + timedelta(minutes=1)).isoformat())
+        self.assertEqual([row['id'] for row in page['changed']], [plant.pk for plant in self.plants[2:]])
+
+    def test_expired_cursor(self):
+        old = timezone.now() - timedelta(days=31)
+        response = self.client.get('/api/plants/changes/', {'updated_since': old.isoformat()})
+        self.assertEqual(response.status_code, 410)
+
+        cursor = encode_cursor(None, (old, 0))
+        response = self.client.get('/api/plants/changes/', {'cursor': cursor})
+        self.assertEqual(response.status_code, 410)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/plants/changes/', {'cursor': 'zzz'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/plants/changes/', {'updated_since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/plants/changes/', {'limit': 0}).status_code, 400)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Blobs are stored once and go, renditions and all, with their last reference"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = image_storage()
+
+    def write_renditions(self, name):
+        names = {}
+        for size in RENDITIONS:
+            names[size] = {'width': 1, 'height': 1}
+            for fmt in FORMATS:
+                names[size][fmt] = default_storage.save(
+                    rendition_name(name, size, fmt), ContentFile(b'rendition')
+                )
+        return names
+
+    def rendition_files(self, renditions):
+        return [entry[fmt] for size, entry in renditions.items() if size != 'source' for fmt in FORMATS]
+
+    def test_reference_counting(self):
+        name = self.storage.save('a.JPG', ContentFile(b'photo'))
+        self.assertTrue(name.startswith(BLOB_PREFIX) and name.endswith('.jpg'))
+        self.assertEqual(self.storage.save('b.jpg', ContentFile(b'photo')), name)
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 2)
+        renditions = self.write_renditions(name)
+
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 1)
+
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+        self.assertFalse(any(map(default_storage.exists, self.rendition_files(renditions))))
+
+    def test_blob_without_a_row_is_kept(self):
+        name = self.storage.save('a.jpg', ContentFile(b'photo'))
+        ImageBlob.objects.filter(name=name).delete()
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_dedupe_moves_renditions_with_the_blob(self):
+        old_renditions = {}
+        for old_name in ('plants/main/a.jpg', 'plants/main/b.jpg'):
+            default_storage.save(old_name, ContentFile(b'photo'))
+            old_renditions[old_name] = {'source': old_name, **self.write_renditions(old_name)}
+        Plant.objects.bulk_create(
+            Plant(**plant_fields(i, main_image=old_name, main_image_renditions=renditions))
+            for i, (old_name, renditions) in enumerate(old_renditions.items())
+        )
+
+        call_command('dedupe_media', stdout=io.StringIO(), stderr=io.StringIO())
+
+        [name] = set(Plant.objects.values_list('main_image', flat=True))
+        self.assertEqual(ImageBlob.objects.get(name=name).references, 2)
+        for plant in Plant.objects.all():
+            renditions = plant.main_image_renditions
+            self.assertEqual(renditions['source'], name)
+            self.assertEqual(renditions['card']['webp'], rendition_name(name, 'card', 'webp'))
+            self.assertTrue(all(map(default_storage.exists, self.rendition_files(renditions))))
+        for renditions in old_renditions.values():
+            self.assertFalse(any(map(default_storage.exists, self.rendition_files(renditions))))
+
+        self.storage.delete(name)
+        self.storage.delete(name)
+        self.assertFalse(any(map(default_storage.exists, self.rendition_files(renditions))))
+
+
+@override_settings(PLANTS_SIMILAR_COUNT=5)
+class SimilarPlantTests(TestCase):
+    """Incremental refreshes leave the same lists as a full rebuild"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        plants = []
+        for i in range(80):
+            low = rng.randint(-10, 20)
+            plants.append(Plant(**plant_fields(
+                i,
+                light_requirement=rng.choice(('low', 'high')),
+                water_requirement='medium',
+                temperature_min=low,
+                temperature_max=low + rng.randint(5, 20),
+                humidity_requirement=rng.randint(20, 80),
+                mature_height=rng.randint(10, 300),
+                growth_rate=rng.choice(('slow', 'medium', 'fast')),
+                edible=rng.random() < 0.3,
+            )))
+        Plant.objects.bulk_create(plants)
+
+    def setUp(self):
+        rebuild_similar()
+        self.plants = list(Plant.objects.order_by('pk'))
+
+    def lists(self):
+        return list(SimilarPlant.objects.order_by('plant', 'rank').values_list('plant', 'similar', 'rank'))
+
+    def assertMatchesRebuild(self):
+        refreshed = self.lists()
+        rebuild_similar()
+        self.assertEqual(refreshed, self.lists())
+
+    def test_edit(self):
+        for plant, changes in (
+            (self.plants[3], {'temperature_min': 40, 'temperature_max': 50}),
+            (self.plants[10], {'light_requirement': 'medium'}),
+            (self.plants[20], {'temperature_min': self.plants[21].temperature_min,
+                               'temperature_max': self.plants[21].temperature_max,
+                               'light_requirement': self.plants[21].light_requirement}),
+        ):
+            with self.subTest(plant=plant.pk, changes=changes):
+                before = self.lists()
+                Plant.objects.filter(pk=plant.pk).update(**changes)
+                refresh_similar([plant.pk])
+                self.assertNotEqual(self.lists(), before)
+                self.assertMatchesRebuild()
+
+    def test_delete(self):
+        plant = self.plants[5]
+        listing = list(SimilarPlant.objects.filter(similar=plant).values_list('plant_id', flat=True))
+        self.assertTrue(listing)
+        plant_id = plant.pk
+        # What the pre_delete signal queues
+        Plant.objects.filter(pk=plant_id).delete()
+        refresh_similar([plant_id, *listing])
+        self.assertFalse(SimilarPlant.objects.filter(plant_id=plant_id).exists())
+        self.assertMatchesRebuild()
+
+
+class ParseAttributeTests(SimpleTestCase):
+
+    def test_parse_hardiness_zone(self):
+        for text, zones in (
+            ('7', (7, 13)),
+            ('USDA 7', (7, 13)),
+            ('10-12', (10, 12)),
+            ('5a-9b', (5, 9)),
+            ('Zones 9 to 4', (4, 9)),
+            ('H5', (7, 13)),
+            ('h1a', (13, 13)),
+            ('H1', (11, 13)),
+            ('0-14', (None, None)),
+            ('hardy', (None, None)),
+            ('', (None, None)),
+            (None, (None, None)),
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(parse_hardiness_zone(text), zones)
+
+    def test_parse_available_months(self):
+        def months(*numbers):
+            return sum(1 << (number - 1) for number in numbers)
+
+        for text, mask in (
+            ('', ALL_MONTHS),
+            (None, ALL_MONTHS),
+            ('Year-round', ALL_MONTHS),
+            ('May', months(5)),
+            ('March-June', months(3, 4, 5, 6)),
+            ('Sept, Oct', months(9, 10)),
+            ('winter', months(12, 1, 2)),
+            ('Nov through Feb', months(11, 12, 1, 2)),
+            ('spring to early summer', months(3, 4, 5, 6, 7, 8)),
+            ('spring and fall', months(3, 4, 5, 9, 10, 11)),
+            ('ask us', None),
+            ('ma', None),
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(parse_available_months(text), mask)
+
+
+@override_settings(PLANTS_CACHE_TIMEOUT=0)
+class ZoneAndMonthFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        nursery = User.objects.create_user('nursery', password='x')
+        cls.temperate = Plant.objects.create(**plant_fields(0, hardiness_zone='4-8'))
+        cls.tropical = Plant.objects.create(**plant_fields(1, hardiness_zone='10-12'))
+        cls.unknown = Plant.objects.create(**plant_fields(2, hardiness_zone='ask'))
+        cls.spring = PlantInventory.objects.create(
+            plant=cls.temperate, nursery=nursery, quantity=1, price=1, size='S',
+            seasonal_availability='March-May',
+        )
+        cls.winter = PlantInventory.objects.create(
+            plant=cls.tropical, nursery=nursery, quantity=1, price=1, size='S',
+            seasonal_availability='winter',
+        )
+
+    def ids(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.json()['results']}
+
+    def test_plant_filters(self):
+        self.assertEqual(self.ids('/api/plants/', zone='7b'), {self.temperate.pk})
+        self.assertEqual(self.ids('/api/plants/', zone=11), {self.tropical.pk})
+        self.assertEqual(self.ids('/api/plants/', month='april'), {self.temperate.pk})
+        self.assertEqual(self.ids('/api/plants/', month=1), {self.tropical.pk})
+        self.assertEqual(self.ids('/api/plants/', month='jan', zone=7), set())
+
+    def test_inventory_filters(self):
+        self.assertEqual(self.ids('/api/inventory/', month='Apr'), {self.spring.pk})
+        self.assertEqual(self.ids('/api/inventory/', month='december'), {self.winter.pk})
+        self.assertEqual(self.ids('/api/inventory/', zone=5), {self.spring.pk})
+
+    def test_invalid_values(self):
+        response = self.client.get('/api/plants/', {'zone': 14, 'month': 'smarch'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'zone', 'month'})
+        self.assertEqual(self.client.get('/api/inventory/', {'month': 13}).status_code, 400)
+
+
+@override_settings(PLANTS_CACHE_TIMEOUT=0)
+class FacetFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('nursery', password='x')
+        cls.plant = Plant.objects.create(**plant_fields(0, light_requirement='low'))
+
+    def test_filters_narrow_lists_only(self):
+        self.assertEqual(self.client.get('/api/plants/', {'light_requirement': 'bright'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/plants/', {'light_requirement': 'high'}).json()['results'], [])
+
+        url = f'/api/plants/{self.plant.pk}/?light_requirement=high&price_min=x'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.force_login(self.user)
+        response = self.client.patch(url, {'description': 'new'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 204)
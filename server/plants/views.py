@@ -1,105 +1,180 @@
-from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework import viewsets, mixins, status
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Plant, PlantInventory
-from .serializers import PlantSerializer, PlantInventorySerializer
-import csv
-from io import StringIO
+from rest_framework.exceptions import NotFound, ValidationError
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.views.static import serve
+from .models import Plant, PlantImage, PlantInventory, ImportJob, NurseryProfile, SimilarPlant, StockReservation
+from .serializers import (
+    PlantSerializer, PlantSummarySerializer, PlantInventorySerializer, ImportJobSerializer,
+    StockReservationSerializer, ReservationQuantitySerializer, ReservationBatchSerializer
+)
+from .importers import PlantCSVImporter, parse_natural_key
+from .jobs import enqueue_import_job
+from .search import search_plants
+from .filters import PlantFilterSet, available_in, get_list_param, hardy_in, parse_zone_and_month
+from .pagination import PlantPagination, InventoryPagination
+from .cache import cache_response
+from .geo import parse_near, filter_plants_near, filter_inventory_near
+from .inventory_sync import InventorySync
+from .changes import read_changes
+from .storage import BLOB_PREFIX, IMMUTABLE_CACHE_CONTROL
+from .reservations import InsufficientStock, reserve as reserve_stock, release, confirm
+from .fast_lists import FastListMixin
+from .renderers import is_plain
+from .exports import EXPORT_RENDERERS, INVENTORY_EXPORT_COLUMNS, PLANT_EXPORT_COLUMNS, export_response
 
-class PlantViewSet(viewsets.ModelViewSet):
+class PlantViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Plant.objects.all()
     serializer_class = PlantSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PlantPagination
 
-    def get_queryset(self):
+    def has_ranked_ordering(self):
+        """Results are ordered by search relevance or distance"""
+        params = self.request.query_params
+        return bool(params.get('search') or params.get('near'))
+
+    def get_base_queryset(self):
+        """Plants matching ``search``, ``category`` and ``near``, before facet filters"""
         queryset = Plant.objects.all().order_by('common_name')
         search = self.request.query_params.get('search', None)
         category = self.request.query_params.get('category', None)
-
-        if search:
-            queryset = queryset.filter(
-                Q(common_name__icontains=search) |
-                Q(scientific_name__icontains=search)
-            )
+        near = parse_near(self.request.query_params)
 
         if category == 'indoor':
             queryset = queryset.filter(indoor_suitable=True)
         elif category == 'outdoor':
             queryset = queryset.filter(indoor_suitable=False)
 
+        if near:
+            queryset = filter_plants_near(queryset, *near)
+
+        if search:
+            queryset = search_plants(queryset, search)
+
         return queryset
 
+    def get_filterset(self):
+        if not hasattr(self, '_filterset'):
+            self._filterset = PlantFilterSet(self.request.query_params)
+        return self._filterset
+
+    def get_fieldset(self):
+        """``fields``/``omit`` serializer kwargs from the query string"""
+        params = self.request.query_params
+        fieldset = {}
+        for name in ('fields', 'omit'):
+            values = get_list_param(params, name)
+            if values:
+                unknown = set(values) - set(PlantSerializer.Meta.fields)
+                if unknown:
+                    raise ValidationError({name: f"Unknown field(s): {', '.join(sorted(unknown))}"})
+                fieldset[name] = values
+        return fieldset
+
+    def get_serializer_class(self):
+        # Lists default to the compact summary unless specific fields are
+        # asked for with ?fields= or ?omit=
+        if self.action in ('list', 'similar') and not self.get_fieldset():
+            return PlantSummarySerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve', 'changes', 'similar'):
+            kwargs.update(self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = self.get_base_queryset()
+        # Facet filters only narrow lists; a stray one mustn't fail a detail
+        # or write request (export applies them itself)
+        if self.action == 'list':
+            queryset = self.get_filterset().filter(queryset)
+        if self.action in ('list', 'retrieve'):
+            # Never read columns the response won't include
+            return PlantSerializer.setup_eager_loading(queryset, serializer=self.get_serializer())
+        return PlantSerializer.setup_eager_loading(queryset)
+
+    @cache_response(Plant, PlantImage, PlantInventory, NurseryProfile)
+    def list(self, request, *args, **kwargs):
+        """List plants; ``?facets=true`` adds per-facet counts to the response"""
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get('facets', '').lower() == 'true':
+            facets = self.get_filterset().facet_counts(self.get_base_queryset())
+            response.plain_json = getattr(response, 'plain_json', False) and is_plain(facets)
+            if isinstance(response.data, dict):
+                response.data['facets'] = facets
+            else:
+                response.data = {'results': response.data, 'facets': facets}
+        return response
+
+    @cache_response(Plant, PlantImage, PlantInventory, NurseryProfile)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    @cache_response(SimilarPlant, Plant, PlantImage, PlantInventory, NurseryProfile)
+    def similar(self, request, pk=None):
+        """Plants most like this one, nearest first (see plants.similarity)"""
+        queryset = Plant.objects.filter(similar_to__plant_id=pk).order_by('similar_to__rank')
+        plants = list(PlantSerializer.setup_eager_loading(queryset, serializer=self.get_serializer()))
+        if not plants and not Plant.objects.filter(pk=pk).exists():
+            raise NotFound()
+        return Response(self.get_serializer(plants, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Plants changed or deleted since ``?cursor=`` or ``?updated_since=``"""
+        page = read_changes(
+            PlantSerializer.setup_eager_loading(Plant.objects.all(), serializer=self.get_serializer()),
+            request.query_params
+        )
+        page['changed'] = self.get_serializer(page['changed'], many=True).data
+        return Response(page)
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream every plant matching the list filters as CSV or NDJSON
+
+        The columns are the ones ``upload_csv`` reads.
+        """
+        queryset = self.get_filterset().filter(self.get_base_queryset())
+        return export_response(request, queryset, PLANT_EXPORT_COLUMNS, 'plants')
+
     @action(detail=False, methods=['post'])
     def upload_csv(self, request):
-        """Upload plants data via CSV"""
+        """Upload plants data via CSV
+
+        Pass ``mode=upsert`` to update plants matched on ``key`` (default
+        ``scientific_name``) instead of always creating new ones.
+        """
         if not request.FILES.get('file'):
             return Response(
                 {"error": "No file provided"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        csv_file = request.FILES['file']
-        decoded_file = csv_file.read().decode('utf-8')
-        csv_data = csv.DictReader(StringIO(decoded_file))
-        plants_data = []
-        errors = []
-
-        for row in csv_data:
-            try:
-                plant_data = {
-                    'common_name': row['common_name'],
-                    'scientific_name': row['scientific_name'],
-                    'description': row['description'],
-                    'care_instructions': row.get('care_instructions', ''),
-                    'planting_instructions': row.get('planting_instructions', ''),
-                    'light_requirement': row.get('light_requirement', 'medium'),
-                    'water_requirement': row.get('water_requirement', 'medium'),
-                    'temperature_min': int(row.get('temperature_min', 15)),
-                    'temperature_max': int(row.get('temperature_max', 30)),
-                    'humidity_requirement': int(row.get('humidity_requirement', 50)),
-                    'soil_type': row.get('soil_type', ''),
-                    'fertilizer_requirements': row.get('fertilizer_requirements', ''),
-                    'mature_height': float(row.get('mature_height', 30)),
-                    'mature_spread': float(row.get('mature_spread', 30)),
-                    'growth_rate': row.get('growth_rate', 'medium'),
-                    'time_to_maturity': row.get('time_to_maturity', ''),
-                    'hardiness_zone': row.get('hardiness_zone', ''),
-                    'native_region': row.get('native_region', ''),
-                    'price': float(row.get('price', 0)),
-                    'quantity': int(row.get('quantity', 0)),
-                    'drought_tolerant': row.get('drought_tolerant', '').lower() == 'true',
-                    'deer_resistant': row.get('deer_resistant', '').lower() == 'true',
-                    'pest_resistant': row.get('pest_resistant', '').lower() == 'true',
-                    'edible': row.get('edible', '').lower() == 'true',
-                    'indoor_suitable': row.get('indoor_suitable', '').lower() == 'true',
-                }
-
-                serializer = PlantSerializer(data=plant_data)
-                if serializer.is_valid():
-                    plants_data.append(plant_data)
-                else:
-                    errors.append(f"Error in row for {row.get('common_name')}: {serializer.errors}")
-            except Exception as e:
-                errors.append(f"Error processing row for {row.get('common_name')}: {str(e)}")
-
-        if errors:
-            return Response(
-                {"errors": errors},
-                status=status.HTTP_400_BAD_REQUEST
+        try:
+            importer = PlantCSVImporter(
+                user=request.user,
+                mode=request.data.get('mode', 'create'),
+                key_fields=parse_natural_key(request.data.get('key')),
             )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create plants if no errors found
-        created_plants = []
-        for plant_data in plants_data:
-            plant = Plant.objects.create(**plant_data, created_by=request.user)
-            created_plants.append(plant)
+        result = importer.run(request.FILES['file'])
 
-        return Response({
-            "message": f"Successfully imported {len(created_plants)} plants",
-            "count": len(created_plants)
-        })
+        if result['error_count']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+
+        message = f"Successfully imported {result['count']} plants"
+        if importer.mode == 'upsert':
+            message += f", updated {result['updated']}, {result['unchanged']} unchanged"
+        return Response({"message": message, **result})
 
     @action(detail=True, methods=['post'])
     def use_as_template(self, request, pk=None):
@@ -126,19 +201,176 @@ class PlantViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class PlantInventoryViewSet(viewsets.ModelViewSet):
+class PlantInventoryViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = PlantInventory.objects.all()
     serializer_class = PlantInventorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = InventoryPagination
+
+    def has_ranked_ordering(self):
+        """Results are ordered by distance"""
+        return bool(self.request.query_params.get('near'))
 
     def get_queryset(self):
         queryset = PlantInventory.objects.all()
         nursery_id = self.request.query_params.get('nursery_id', None)
+        near = parse_near(self.request.query_params)
+        errors = {}
+        zone, month = parse_zone_and_month(self.request.query_params, errors)
+        if errors:
+            raise ValidationError(errors)
 
         if nursery_id:
             queryset = queryset.filter(nursery_id=nursery_id)
 
-        return queryset.select_related('plant')
+        if zone is not None:
+            queryset = queryset.filter(hardy_in(zone, prefix='plant__'))
+
+        if month is not None:
+            queryset = queryset.filter(available_in(month))
+
+        if near:
+            queryset = filter_inventory_near(queryset, *near)
+
+        return PlantInventorySerializer.setup_eager_loading(queryset)
+
+    @cache_response(PlantInventory, Plant, PlantImage, NurseryProfile)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response(PlantInventory, Plant, PlantImage, NurseryProfile)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(nursery=self.request.user)
\ No newline at end of file
+        serializer.save(nursery=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Inventory changed or deleted since ``?cursor=`` or ``?updated_since=``"""
+        page = read_changes(
+            PlantInventorySerializer.setup_eager_loading(PlantInventory.objects.all()),
+            request.query_params
+        )
+        page['changed'] = self.get_serializer(page['changed'], many=True).data
+        return Response(page)
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream every inventory row matching the list filters as CSV or NDJSON
+
+        The columns are the ones ``bulk`` reads.
+        """
+        return export_response(request, self.get_queryset(), INVENTORY_EXPORT_COLUMNS, 'inventory')
+
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAuthenticated])
+    def bulk_sync(self, request):
+        """Create or update many of the caller's inventory rows in one request
+
+        Accepts a CSV ``file`` or a JSON list (bare or under ``items``) of rows
+        keyed by ``plant_id`` and ``size``, carrying any of ``quantity``,
+        ``price``, ``notes`` and ``seasonal_availability``.
+        """
+        sync = InventorySync(request.user)
+        if request.FILES.get('file'):
+            result = sync.run(request.FILES['file'])
+        else:
+            items = request.data.get('items') if hasattr(request.data, 'get') else request.data
+            if not isinstance(items, list):
+                return Response(
+                    {"error": "Expected a CSV file or a list of inventory rows"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            result = sync.run_rows(enumerate(items, 1))
+
+        if result['error_count']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def reserve(self, request, pk=None):
+        """Hold ``quantity`` units of this inventory row until checkout"""
+        serializer = ReservationQuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        inventory = get_object_or_404(PlantInventory.objects.only('id'), pk=pk)
+        return self.create_reservations(
+            request, [(inventory.pk, serializer.validated_data['quantity'])]
+        )
+
+    @action(detail=False, methods=['post'], url_path='reserve', permission_classes=[IsAuthenticated])
+    def reserve_batch(self, request):
+        """Hold several inventory rows at once; nothing is held if any is short"""
+        serializer = ReservationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.create_reservations(request, [
+            (item['inventory_id'], item['quantity'])
+            for item in serializer.validated_data['items']
+        ])
+
+    def create_reservations(self, request, items):
+        try:
+            reservations = reserve_stock(items, user=request.user)
+        except InsufficientStock as e:
+            return Response({
+                'detail': 'Insufficient stock',
+                'inventory_id': e.inventory_id,
+                'requested': e.requested,
+            }, status=status.HTTP_409_CONFLICT)
+        return Response(
+            StockReservationSerializer(reservations, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+class ImportJobViewSet(mixins.CreateModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin,
+                       viewsets.GenericViewSet):
+    """Queue CSV plant imports to run in the background and poll their progress"""
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(created_by=request.user)
+        enqueue_import_job(job)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+class StockReservationViewSet(mixins.RetrieveModelMixin,
+                              mixins.ListModelMixin,
+                              viewsets.GenericViewSet):
+    """A user's stock reservations, which they can release or confirm"""
+    queryset = StockReservation.objects.all()
+    serializer_class = StockReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return StockReservation.objects.filter(reserved_by=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        reservation = self.get_object()
+        release([reservation])
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        reservation = self.get_object()
+        if not confirm(reservation):
+            reservation.refresh_from_db()
+            return Response({
+                'detail': f'Reservation is {"expired" if reservation.is_expired else reservation.status}'
+            }, status=status.HTTP_409_CONFLICT)
+        reservation.refresh_from_db()
+        return Response(self.get_serializer(reservation).data)
+
+def serve_image_blob(request, path):
+    """Serve a content-addressed image; its name changes whenever its bytes do"""
+    response = serve(request, BLOB_PREFIX + path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
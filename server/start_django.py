@@ -1,9 +1,19 @@
 import os
+import sys
+
 import django
 from django.core.management import execute_from_command_line
 
 if __name__ == "__main__":
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nursery_backend.settings')
+
+    if '--production' in sys.argv[1:]:
+        # Pre-forking gunicorn, configured from the environment by
+        # gunicorn.conf.py; see there for the knobs
+        os.environ.setdefault('DJANGO_DEBUG', 'false')
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py'])
+
     try:
         django.setup()
         # Run Django development server on port 8000